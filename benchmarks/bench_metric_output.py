@@ -0,0 +1,71 @@
+"""Compare the `metric_output` formats of `metric_response_time`.
+
+Formats a synthetic `/api/v1/query` response with dense series in each
+format and serialises the result the way RECORD messages are written,
+reporting records/sec, points/sec and bytes out.
+
+Usage:
+
+    poetry run python benchmarks/bench_metric_output.py [--points 100000] [--series 10]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from tap_datadog.pointlists import METRIC_OUTPUTS, format_metric_record
+
+
+def metric_response(points: int, series: int) -> dict:
+    rng = random.Random(0)
+    start = 1700000000000.0
+    return {
+        "resp_version": 1,
+        "query": "trace.aspnet.request.duration{env:production}",
+        "from_date": int(start),
+        "to_date": int(start) + points // series * 1000,
+        "series": [
+            {
+                "metric": "trace.aspnet.request.duration",
+                "scope": f"env:production,service:api-{index}",
+                "expression": f"trace.aspnet.request.duration{{service:api-{index}}}",
+                "pointlist": [
+                    [start + point * 1000, rng.random() * 250]
+                    for point in range(points // series)
+                ],
+            }
+            for index in range(series)
+        ],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--series", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    response = metric_response(args.points, args.series)
+    print(f"{args.points} points in {args.series} series, best of {args.repeat}")
+    for output in METRIC_OUTPUTS:
+        best = None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            records = 0
+            size = 0
+            for record in format_metric_record(response, output):
+                records += 1
+                size += len(json.dumps(record))
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        print(
+            f"{output:<9} {records:>8} records  {best:7.3f} s  "
+            f"{records / best:>12,.0f} rec/s  {args.points / best:>12,.0f} points/s  "
+            f"{size / 2 ** 20:8.2f} MiB out"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Benchmark the startup time of the `tap-datadog` command.
+
+Each scenario runs the tap's CLI in a fresh interpreter, several times, and
+reports the median and minimum wall time:
+
+* `import`: importing `tap_datadog.tap`
+* `about`: `--about --format json`
+* `discover`: `--discover`
+* `sync`: a sync of one selected stream from a catalog, against the local stub
+  server with a single small window, as in an hourly cron run
+
+Results can be saved as JSON together with the current commit and compared
+with an earlier run.
+
+Usage:
+
+    poetry run python benchmarks/bench_startup.py [--runs 10] [--stream slo_history] \\
+        [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from bench_sync import STREAMS, current_commit
+from stub_server import StubOptions, StubServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = "from tap_datadog.tap import TapDatadog; TapDatadog.cli()"
+
+
+def run(args: List[str]) -> float:
+    """Return the wall time of one run of the tap in a fresh interpreter."""
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT}
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, *args],
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - started
+
+
+def select_stream(catalog: dict, stream_name: str) -> dict:
+    """Return the catalog with only `stream_name` selected."""
+    for entry in catalog["streams"]:
+        for metadata in entry["metadata"]:
+            if not metadata["breadcrumb"]:
+                metadata["metadata"]["selected"] = entry["tap_stream_id"] == stream_name
+    return catalog
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="runs per scenario")
+    parser.add_argument("--stream", default="slo_history", choices=STREAMS)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with the results of an earlier run")
+    args = parser.parse_args()
+
+    options = StubOptions(series=1, points=60, buckets=10, pages=1, slos=1)
+    results: Dict[str, Any] = {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "stream": args.stream,
+        "scenarios": {},
+    }
+    with StubServer(options) as stub, tempfile.TemporaryDirectory() as directory:
+        yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+        config_path = os.path.join(directory, "config.json")
+        catalog_path = os.path.join(directory, "catalog.json")
+        with open(config_path, "w") as config:
+            json.dump(
+                {
+                    "api_key": "benchmark",
+                    "app_key": "benchmark",
+                    "start_date": yesterday.strftime("%Y-%m-%d"),
+                    "aggregate_logs_start_date": yesterday.strftime("%Y-%m-%d"),
+                    "window_mode": "daily",
+                    "slo_ids": ["0" * 32],
+                    "api_url": stub.url,
+                },
+                config,
+            )
+        discovered = subprocess.run(
+            [sys.executable, "-c", CLI, "--config", config_path, "--discover"],
+            env={**os.environ, "PYTHONPATH": REPO_ROOT},
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        with open(catalog_path, "w") as catalog:
+            json.dump(select_stream(json.loads(discovered), args.stream), catalog)
+
+        scenarios = {
+            "import": ["-c", "import tap_datadog.tap"],
+            "about": ["-c", CLI, "--about", "--format", "json"],
+            "discover": ["-c", CLI, "--config", config_path, "--discover"],
+            "sync": ["-c", CLI, "--config", config_path, "--catalog", catalog_path],
+        }
+        for name, command in scenarios.items():
+            times = [run(command) for _ in range(args.runs)]
+            result = {"median_seconds": statistics.median(times), "min_seconds": min(times)}
+            results["scenarios"][name] = result
+            print(
+                f"{name:<10} median {result['median_seconds'] * 1000:8.1f} ms  "
+                f"min {result['min_seconds'] * 1000:8.1f} ms"
+            )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as baseline:
+            before = json.load(baseline)
+        print(f"\ncompared with {before.get('commit')}:")
+        for name, result in results["scenarios"].items():
+            previous = before.get("scenarios", {}).get(name)
+            if not previous:
+                continue
+            change = result["median_seconds"] / previous["median_seconds"] - 1
+            print(
+                f"  {name:<10} {previous['median_seconds'] * 1000:8.1f} ms -> "
+                f"{result['median_seconds'] * 1000:8.1f} ms  ({change:+.1%})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Compare full-body and streaming JSON parsing of large Datadog responses.
+
+Synthetic aggregate bucket lists and metric pointlists are generated chunk by
+chunk, the way they arrive from the network, and parsed with both the
+`records_jsonpath` path (read the body, `json.loads`, extract) and
+`tap_datadog.parsing.StreamingItems`.
+
+Usage:
+
+    poetry run python benchmarks/bench_streaming_json.py [--size 200000]
+"""
+
+import argparse
+import io
+import json
+import time
+import tracemalloc
+from typing import Callable, Iterable, Iterator
+
+from singer_sdk.helpers.jsonpath import extract_jsonpath
+
+from tap_datadog.parsing import StreamingItems, get_ijson_backend
+
+
+class ChunkedBody(io.RawIOBase):
+    """A file-like response body produced a chunk at a time."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def network_chunks(pieces: Iterable[bytes], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Regroup generated pieces into socket-sized reads."""
+    buffer = bytearray()
+    for piece in pieces:
+        buffer += piece
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def aggregate_chunks(size: int) -> Iterator[bytes]:
+    return network_chunks(_aggregate_pieces(size))
+
+
+def metric_chunks(size: int, series: int = 10) -> Iterator[bytes]:
+    return network_chunks(_metric_pieces(size, series))
+
+
+def _aggregate_pieces(size: int) -> Iterator[bytes]:
+    yield b'{"data": {"buckets": ['
+    for index in range(size):
+        bucket = {
+            "by": {
+                "@http.status_code": 200 + index % 5,
+                "@Properties.OrganizationId": index % 977,
+                "@Properties.PathTemplate": f"/api/v2/things/{index % 131}",
+                "@Properties.RequestMethod": "GET",
+            },
+            "computes": {"c0": index, "c1": index * 1.5},
+        }
+        yield (b", " if index else b"") + json.dumps(bucket).encode()
+    yield b']}, "meta": {"page": {"after": "cursor"}}}'
+
+
+def _metric_pieces(size: int, series: int) -> Iterator[bytes]:
+    yield b'{"resp_version": 1, "query": "q", "series": ['
+    for index in range(series):
+        yield (b", " if index else b"") + b'{"metric": "m", "pointlist": ['
+        for point in range(size // series):
+            yield (b", " if point else b"") + json.dumps(
+                [1700000000000.0 + point * 1000, point * 0.25]
+            ).encode()
+        yield b"]}"
+    yield b'], "from_date": 0, "to_date": 1}'
+
+
+def full_body(chunks: Iterable[bytes], jsonpath: str) -> Iterator[dict]:
+    body = b"".join(chunks)
+    yield from extract_jsonpath(jsonpath, input=json.loads(body))
+
+
+def streaming(chunks: Iterable[bytes], prefix: str) -> Iterator[dict]:
+    yield from StreamingItems(io.BufferedReader(ChunkedBody(chunks)), prefix)
+
+
+def measure(
+    name: str,
+    parse: Callable[[Iterable[bytes]], Iterator[dict]],
+    chunks: Callable[[], Iterable[bytes]],
+) -> None:
+    """Time parsing of pre-generated chunks, then trace peak memory while generating."""
+    payload = list(chunks())
+    started = time.perf_counter()
+    count = sum(1 for _ in parse(payload))
+    elapsed = time.perf_counter() - started
+    megabytes = sum(len(chunk) for chunk in payload) / 2 ** 20
+    del payload
+
+    tracemalloc.start()
+    for _ in parse(chunks()):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<22} {count:>8} records  {elapsed:7.3f} s  "
+        f"{megabytes / elapsed:7.1f} MiB/s  peak {peak / 2 ** 20:7.1f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=200000)
+    args = parser.parse_args()
+
+    if get_ijson_backend() is None:
+        raise SystemExit("ijson is not installed: poetry install -E streaming")
+    print(f"ijson backend: {get_ijson_backend().backend_name}, size: {args.size}")
+
+    jsonpath, prefix = "$.data.buckets.[*]", "data.buckets.item"
+    aggregate = lambda: aggregate_chunks(args.size)  # noqa: E731
+    measure("aggregate full body", lambda c: full_body(c, jsonpath), aggregate)
+    measure("aggregate streaming", lambda c: streaming(c, prefix), aggregate)
+
+    jsonpath, prefix = "$.series[*]", "series.item"
+    metric = lambda: metric_chunks(args.size)  # noqa: E731
+    measure("metric full body", lambda c: full_body(c, jsonpath), metric)
+    measure("metric streaming", lambda c: streaming(c, prefix), metric)
+
+if __name__ == "__main__":
+    main()
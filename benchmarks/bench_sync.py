@@ -0,0 +1,212 @@
+"""Benchmark end-to-end syncs of `TapDatadog` against the local stub server.
+
+Each stream is synced in its own process against `stub_server.StubServer`, with
+RECORD messages counted instead of written out. For every stream, the harness
+records wall time, records/sec, RECORD bytes, peak RSS and the requests the
+stub served, including 429s. Results can be saved as JSON together with the
+current commit and compared with an earlier run, so a change can be measured
+without network access.
+
+Usage:
+
+    poetry run python benchmarks/bench_sync.py [--days 7] [--latency 0.05] \\
+        [--config '{"max_workers": 8, "parallel_backfill": true}'] \\
+        [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from stub_server import StubOptions, StubServer
+
+STREAMS = ["aggregate_logs", "log_events", "logs_aggregate", "metric_response_time", "slo_history"]
+
+# Three named queries, two of which share a request.
+AGGREGATE_QUERIES = [
+    {
+        "name": "requests_by_path",
+        "query": "source:degreed.api",
+        "group_by": ["@Properties.PathTemplate", "@http.status_code"],
+        "computes": [
+            {"name": "requests", "aggregation": "count"},
+            {"name": "elapsed_ms", "aggregation": "sum", "metric": "@Properties.Elapsed"},
+        ],
+    },
+    {
+        "name": "latency_by_path",
+        "query": "source:degreed.api",
+        "group_by": ["@Properties.PathTemplate", "@http.status_code"],
+        "computes": [{"name": "p95_ms", "aggregation": "pc95", "metric": "@Properties.Elapsed"}],
+    },
+    {
+        "name": "errors_by_org",
+        "query": "source:degreed.api status:error",
+        "group_by": ["@Properties.OrganizationId"],
+        "computes": [{"name": "errors", "aggregation": "count", "interval": "1h"}],
+    },
+]
+
+
+class RecordCounter:
+    """A stdout replacement counting RECORD and BATCH messages and RECORD bytes."""
+
+    def __init__(self):
+        self.records = 0
+        self.bytes = 0
+        self.batches = 0
+
+    def write(self, data: str) -> int:
+        for line in data.splitlines(keepends=True):
+            if '"RECORD"' in line[:40]:
+                self.records += 1
+                self.bytes += len(line)
+            elif '"BATCH"' in line[:40]:
+                self.batches += 1
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+
+def sync_stream(stream_name: str, config: dict, results: "multiprocessing.Queue") -> None:
+    """Sync one stream in a child process and report its measurements."""
+    import resource
+
+    counter = RecordCounter()
+    sys.stdout = counter  # type: ignore
+    try:
+        from tap_datadog.tap import TapDatadog
+
+        tap = TapDatadog(config=config, parse_env_config=False)
+        stream = tap.streams[stream_name]
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        stream.sync()
+        stream.finalize_state_progress_markers()
+        wall = time.perf_counter() - started
+        summary = tap.instrumentation.stream_summary(stream_name)
+        # Records written to batch files are not RECORD messages, so count them at the source.
+        records = summary["totals"].get("records", counter.records)
+        results.put(
+            {
+                "wall_seconds": wall,
+                "records": records,
+                "records_per_second": records / wall if wall else 0.0,
+                "record_bytes": counter.bytes,
+                "batch_messages": counter.batches,
+                "rss_before_kb": rss_before,
+                "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                "instrumentation": {
+                    "totals": summary["totals"],
+                    "histograms": summary["histograms"],
+                },
+            }
+        )
+    except Exception as exc:
+        results.put({"error": f"{type(exc).__name__}: {exc}"})
+
+
+def run_stream(stream_name: str, config: dict, stub: StubServer) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    stub.reset_counts()
+    process = context.Process(target=sync_stream, args=(stream_name, config, results))
+    process.start()
+    result = results.get()
+    process.join()
+    result["requests"] = dict(stub.requests)
+    result["throttled"] = dict(stub.throttled)
+    return result
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict) -> None:
+    print(f"\ncompared with {baseline.get('commit')}:")
+    for stream, result in results["streams"].items():
+        before = baseline.get("streams", {}).get(stream)
+        if not before or "error" in result or "error" in before:
+            continue
+        for metric in ["wall_seconds", "records_per_second", "peak_rss_kb"]:
+            change = result[metric] / before[metric] - 1 if before[metric] else 0.0
+            print(
+                f"  {stream:<22} {metric:<20} {before[metric]:>14,.2f} -> "
+                f"{result[metric]:>14,.2f}  ({change:+.1%})"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", nargs="+", default=STREAMS, choices=STREAMS)
+    parser.add_argument("--days", type=int, default=7, help="days of closed windows to sync")
+    parser.add_argument("--config", default="{}", help="extra tap config, as JSON")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with the results of an earlier run")
+    for name, default in vars(StubOptions()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+
+    options = StubOptions(**{name: getattr(args, name) for name in vars(StubOptions())})
+    start = datetime.now(timezone.utc) - timedelta(days=args.days)
+    results: Dict[str, Any] = {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "days": args.days,
+        "stub": vars(options),
+        "config": json.loads(args.config),
+        "streams": {},
+    }
+    with StubServer(options) as stub:
+        config = {
+            "api_key": "benchmark",
+            "app_key": "benchmark",
+            "start_date": start.strftime("%Y-%m-%d"),
+            "aggregate_logs_start_date": start.strftime("%Y-%m-%d"),
+            "log_events_start_date": start.strftime("%Y-%m-%d"),
+            "window_mode": "daily",
+            "slo_ids": [f"{index:032x}" for index in range(options.slos)],
+            "aggregate_queries": AGGREGATE_QUERIES,
+            "log_events_queries": [{"name": "all", "query": "*"}],
+            **results["config"],
+            "api_url": stub.url,
+        }
+        for stream in args.streams:
+            result = run_stream(stream, config, stub)
+            results["streams"][stream] = result
+            if "error" in result:
+                print(f"{stream:<22} failed: {result['error']}")
+                continue
+            print(
+                f"{stream:<22} {result['records']:>9} records  {result['wall_seconds']:8.2f} s  "
+                f"{result['records_per_second']:>10,.0f} rec/s  "
+                f"{result['record_bytes'] / 2 ** 20:8.1f} MiB  "
+                f"{result['batch_messages']:>4} batches  "
+                f"peak {result['peak_rss_kb'] / 1024:7.1f} MiB  "
+                f"{sum(result['requests'].values()):>5} requests  "
+                f"{sum(result['throttled'].values()):>4} throttled"
+            )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(results, json.load(baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Compare `/api/v1/query` and `/api/v2/query/timeseries` metric extraction.
+
+Replays the v1 and v2 responses in `benchmarks/fixtures/` for the same grouped,
+rolled-up query and times how fast each is turned into records in every
+`metric_output` format. `tests/test_timeseries.py` checks that both produce
+the same point records. The v2
+response is repeated `--repeat-series` times per request to mimic batching
+many queries into one call.
+
+Usage:
+
+    poetry run python benchmarks/bench_timeseries.py [--repeat-series 200]
+"""
+
+import argparse
+import copy
+import json
+import time
+from pathlib import Path
+
+from tap_datadog.pointlists import METRIC_OUTPUTS, format_metric_record
+from tap_datadog.timeseries import timeseries_payload, timeseries_record
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load(name: str) -> dict:
+    return json.loads((FIXTURES / name).read_text())
+
+
+def v2_record(body: dict, query: str, from_ms: int, to_ms: int) -> dict:
+    return timeseries_record(body, timeseries_payload([query], from_ms, to_ms))
+
+
+def widen(v2: dict, repeat: int) -> dict:
+    """Return the v2 response with its series repeated, as for a batch of queries."""
+    body = copy.deepcopy(v2)
+    attributes = body["data"]["attributes"]
+    attributes["series"] = attributes["series"] * repeat
+    attributes["values"] = attributes["values"] * repeat
+    return body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat-series", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    v1, v2 = load("query_v1.json"), load("timeseries_v2.json")
+
+    v1_body = json.dumps(v1).encode()
+    v2_body = json.dumps(widen(v2, args.repeat_series)).encode()
+    series = len(v2["data"]["attributes"]["series"]) * args.repeat_series
+    print(f"{series} series, best of {args.rounds}")
+    for output in METRIC_OUTPUTS:
+        for name, parse in (
+            ("v1", lambda: [json.loads(v1_body) for _ in range(args.repeat_series)]),
+            (
+                "v2",
+                lambda: [
+                    v2_record(json.loads(v2_body), v1["query"], v1["from_date"], v1["to_date"])
+                ],
+            ),
+        ):
+            best = None
+            for _ in range(args.rounds):
+                started = time.perf_counter()
+                records = 0
+                for response in parse():
+                    for _ in format_metric_record(response, output):
+                        records += 1
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"{name} {output:<9} {records:>8} records  {best * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
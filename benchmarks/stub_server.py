@@ -0,0 +1,335 @@
+"""A local HTTP server imitating the Datadog endpoints the tap reads.
+
+Serves synthetic, deterministic payloads for:
+
+* `GET /api/v1/query` and `POST /api/v2/query/timeseries`
+* `GET /api/v1/slo` and `GET /api/v1/slo/{id}/history`
+* `POST /api/v2/logs/analytics/aggregate`, paginated with `meta.page.after`
+* `POST /api/v2/logs/events/search`, paginated with `meta.page.after`
+
+Payload sizes, per-request latency and rate limits are configurable through
+`StubOptions`. Rate limits are enforced per endpoint family with Datadog's
+`X-RateLimit-*` headers, answering 429 once a period's allowance is used.
+Responses are gzipped when the client accepts it.
+
+Run it on its own to point a tap at it with `api_url`:
+
+    poetry run python benchmarks/stub_server.py --port 8126
+"""
+
+import argparse
+import gzip
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+SLO_HISTORY_PATH = re.compile(r"^/api/v1/slo/(?P<slo_id>[^/]+)/history$")
+
+
+@dataclass
+class StubOptions:
+    """Shape of the stub's responses.
+
+    Attributes:
+        series: Series per metric query.
+        points: Points per series and window.
+        buckets: Aggregate buckets per page.
+        pages: Aggregate pages per window.
+        events: Log events per search window, returned `page.limit` at a time.
+        slos: SLOs listed by `/api/v1/slo`.
+        latency: Seconds each response is delayed by.
+        rate_limit: Requests allowed per endpoint family and period, or 0 for no limit.
+        rate_period: Length of a rate-limit period in seconds.
+    """
+
+    series: int = 10
+    points: int = 1440
+    buckets: int = 1000
+    pages: int = 3
+    events: int = 1000
+    slos: int = 3
+    latency: float = 0.0
+    rate_limit: int = 0
+    rate_period: int = 10
+
+
+class _RateLimits:
+    """Fixed-window request counters per endpoint family."""
+
+    def __init__(self, limit: int, period: int):
+        self.limit = limit
+        self.period = period
+        self._lock = threading.Lock()
+        self._windows: Dict[str, Tuple[int, int]] = {}
+
+    def take(self, family: str) -> Tuple[bool, Dict[str, str]]:
+        now = time.time()
+        window = int(now // self.period)
+        with self._lock:
+            current, used = self._windows.get(family, (window, 0))
+            if current != window:
+                used = 0
+            allowed = used < self.limit
+            used += allowed
+            self._windows[family] = (window, used)
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Period": str(self.period),
+            "X-RateLimit-Remaining": str(self.limit - used),
+            "X-RateLimit-Reset": str(max(1, math.ceil((window + 1) * self.period - now))),
+        }
+        return allowed, headers
+
+
+class StubServer:
+    """Serves synthetic Datadog responses on a background thread.
+
+    Use it as a context manager; `url` is the value for the tap's `api_url`.
+    `requests` counts requests per endpoint family, 429s included.
+    """
+
+    def __init__(self, options: Optional[StubOptions] = None, port: int = 0):
+        self.options = options or StubOptions()
+        self.requests: Counter = Counter()
+        self.throttled: Counter = Counter()
+        self._rate_limits = (
+            _RateLimits(self.options.rate_limit, self.options.rate_period)
+            if self.options.rate_limit
+            else None
+        )
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counts(self) -> None:
+        self.requests.clear()
+        self.throttled.clear()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                self._serve(None)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                self._serve(json.loads(self.rfile.read(length) or b"{}"))
+
+            def _serve(self, body: Optional[dict]) -> None:
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                history = SLO_HISTORY_PATH.match(url.path)
+                family = "/api/v1/slo/history" if history else url.path
+                stub.requests[family] += 1
+
+                headers: Dict[str, str] = {}
+                if stub._rate_limits is not None:
+                    allowed, headers = stub._rate_limits.take(family)
+                    if not allowed:
+                        stub.throttled[family] += 1
+                        return self._send(429, {"errors": ["Rate limit exceeded"]}, headers)
+
+                if stub.options.latency:
+                    time.sleep(stub.options.latency)
+                if history:
+                    payload = stub.slo_history(history.group("slo_id"), query)
+                elif url.path == "/api/v1/slo":
+                    payload = stub.slo_list(query)
+                elif url.path == "/api/v1/query":
+                    payload = stub.metric_query(query)
+                elif url.path == "/api/v2/query/timeseries":
+                    payload = stub.timeseries(body or {})
+                elif url.path == "/api/v2/logs/analytics/aggregate":
+                    payload = stub.aggregate(body or {})
+                elif url.path == "/api/v2/logs/events/search":
+                    payload = stub.log_events(body or {})
+                else:
+                    return self._send(404, {"errors": ["Not found"]}, headers)
+                self._send(200, payload, headers)
+
+            def _send(self, status: int, payload: dict, headers: Dict[str, str]) -> None:
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                    data = gzip.compress(data, compresslevel=1)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def metric_query(self, query: Dict[str, str]) -> dict:
+        start, end = int(query["from"]) * 1000, int(query["to"]) * 1000
+        expressions = query.get("query", "").split(",")
+        step = max((end - start) // max(self.options.points, 1), 1)
+        series = []
+        for query_index, expression in enumerate(expressions):
+            metric = expression.split(":")[-1].split("{")[0]
+            for index in range(self.options.series):
+                scope = f"host:stub-{index}"
+                series.append(
+                    {
+                        "metric": metric,
+                        "scope": scope,
+                        "expression": f"{metric}{{{scope}}}",
+                        "tag_set": [scope],
+                        "query_index": query_index,
+                        "aggregation": "avg",
+                        "interval": step // 1000,
+                        "pointlist": [
+                            [float(start + point * step), (index + point) % 97 * 1.25]
+                            for point in range(self.options.points)
+                        ],
+                    }
+                )
+        return {
+            "status": "ok",
+            "res_type": "time_series",
+            "resp_version": 1,
+            "query": query.get("query"),
+            "from_date": start,
+            "to_date": end,
+            "series": series,
+        }
+
+    def timeseries(self, body: dict) -> dict:
+        attributes = body["data"]["attributes"]
+        start, end = attributes["from"], attributes["to"]
+        step = max((end - start) // max(self.options.points, 1), 1)
+        series, values = [], []
+        for query_index, _ in enumerate(attributes["queries"]):
+            for index in range(self.options.series):
+                series.append({"group_tags": [f"host:stub-{index}"], "query_index": query_index})
+                values.append(
+                    [(index + point) % 97 * 1.25 for point in range(self.options.points)]
+                )
+        return {
+            "data": {
+                "type": "timeseries_response",
+                "attributes": {
+                    "series": series,
+                    "times": [start + point * step for point in range(self.options.points)],
+                    "values": values,
+                },
+            }
+        }
+
+    def slo_list(self, query: Dict[str, str]) -> dict:
+        offset, limit = int(query.get("offset", 0)), int(query.get("limit", 1000))
+        ids = [f"{index:032x}" for index in range(self.options.slos)]
+        return {"data": [{"id": slo_id} for slo_id in ids[offset : offset + limit]]}
+
+    def slo_history(self, slo_id: str, query: Dict[str, str]) -> dict:
+        return {
+            "data": {
+                "from_ts": int(query["from_ts"]),
+                "to_ts": int(query["to_ts"]),
+                "type": "metric",
+                "type_id": 1,
+                "thresholds": {"30d": {"target": 99.9, "timeframe": "30d"}},
+                "overall": {"name": "stub", "sli_value": 99.95, "precision": {"30d": 2}},
+                "slo": {"id": slo_id, "name": f"SLO {slo_id}", "type": "metric", "tags": []},
+            }
+        }
+
+    def aggregate(self, body: dict) -> dict:
+        page = int((body.get("page") or {}).get("cursor") or 0)
+        facets = [group_by["facet"] for group_by in body.get("group_by") or []] or [
+            "@http.status_code",
+            "@Properties.OrganizationId",
+            "@Properties.PathTemplate",
+            "@Properties.RequestMethod",
+        ]
+        computes = body.get("compute") or [{"type": "total"}, {"type": "total"}]
+        buckets = []
+        for index in range(self.options.buckets):
+            value = page * self.options.buckets + index
+            by = {facet: (value + position) % 977 for position, facet in enumerate(facets)}
+            values = {}
+            for position, compute in enumerate(computes):
+                if compute.get("type") == "timeseries":
+                    values[f"c{position}"] = [
+                        {"time": body["filter"]["from"], "value": index * (position + 1)}
+                    ]
+                else:
+                    values[f"c{position}"] = index * (position + 1) * 1.5
+            buckets.append({"by": by, "computes": values})
+        meta: dict = {"status": "done"}
+        if page + 1 < self.options.pages:
+            meta["page"] = {"after": str(page + 1)}
+        return {"data": {"buckets": buckets}, "meta": meta}
+
+    def log_events(self, body: dict) -> dict:
+        page = body.get("page") or {}
+        offset = int(page.get("cursor") or 0)
+        limit = int(page.get("limit") or 10)
+        start = body["filter"]["from"]
+        events = [
+            {
+                "id": f"{start}-{index}",
+                "type": "log",
+                "attributes": {
+                    "timestamp": start,
+                    "host": f"stub-{index % 7}",
+                    "service": "stub-api",
+                    "status": "info" if index % 20 else "error",
+                    "message": f"HTTP GET /api/v2/things/{index % 131} responded 200 in {index % 997}.5 ms",
+                    "tags": ["env:stub", f"version:{index % 3}"],
+                    "attributes": {"http": {"status_code": 200, "method": "GET"}, "duration": index},
+                },
+            }
+            for index in range(offset, min(offset + limit, self.options.events))
+        ]
+        meta: dict = {"status": "done"}
+        if offset + limit < self.options.events:
+            meta["page"] = {"after": str(offset + limit)}
+        return {"data": events, "meta": meta}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8126)
+    for name, default in vars(StubOptions()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+    options = StubOptions(**{name: getattr(args, name) for name in vars(StubOptions())})
+    with StubServer(options, port=args.port) as stub:
+        print(f"Serving stub Datadog API on {stub.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Named log aggregate queries for the `/api/v2/logs/analytics/aggregate` endpoint.
+
+Each entry of `aggregate_queries` names a filter query, the facets its buckets
+are grouped by and the values computed for each bucket:
+
+    {
+        "name": "errors_by_path",
+        "query": "source:degreed.api status:error",
+        "indexes": ["main"],
+        "group_by": ["@Properties.PathTemplate", {"facet": "@http.status_code", "limit": 20}],
+        "facet_limit": 100,
+        "sort": {"aggregation": "count", "order": "desc"},
+        "computes": [
+            {"name": "requests", "aggregation": "count"},
+            {"name": "p95_ms", "aggregation": "pc95", "metric": "@Properties.Elapsed"},
+            {"name": "hourly", "aggregation": "count", "interval": "1h"}
+        ],
+        "window": "daily"
+    }
+
+The API computes any number of values per request but groups each request
+one way, so queries with the same filter, indexes, group-by and window are
+sent as one request with all their computes. The buckets of the shared
+response are then split back into one record per query.
+"""
+
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from tap_datadog.windows import WINDOW_MODE_DAILY, WINDOW_MODE_HOURLY
+
+DEFAULT_INDEXES = ["main"]
+DEFAULT_COMPUTES = [{"aggregation": "count"}]
+
+COMPUTE_TOTAL = "total"
+COMPUTE_TIMESERIES = "timeseries"
+
+# Keys of a compute that are sent to the API; `name` only labels its values.
+_COMPUTE_KEYS = ("aggregation", "type", "metric", "interval")
+
+
+def aggregate_payload(
+    query: str,
+    indexes: Sequence[str],
+    group_by: Sequence[dict],
+    computes: Sequence[dict],
+    start: int,
+    end: int,
+    cursor: Optional[str] = None,
+) -> dict:
+    """Return the body of an aggregate request for the epoch window [start, end)."""
+    payload = {
+        "compute": list(computes),
+        "filter": {
+            "query": query,
+            "from": datetime.fromtimestamp(start, tz=timezone.utc).isoformat(),
+            "to": datetime.fromtimestamp(end, tz=timezone.utc).isoformat(),
+            "indexes": list(indexes),
+        },
+        "group_by": list(group_by),
+    }
+    if cursor:
+        payload["page"] = {"cursor": cursor}
+    return payload
+
+
+@dataclass
+class AggregateQuery:
+    """One named aggregate query, as configured in `aggregate_queries`."""
+
+    name: str
+    query: str
+    indexes: List[str]
+    group_by: List[dict]
+    compute_names: List[str]
+    computes: List[dict]
+    window: str = WINDOW_MODE_DAILY
+
+    @classmethod
+    def from_config(cls, entry: dict, default_window: str = WINDOW_MODE_DAILY) -> "AggregateQuery":
+        """Return the query of an `aggregate_queries` entry, with its defaults applied."""
+        name = entry.get("name")
+        if not name:
+            raise ValueError(f"Aggregate query has no name: {entry}")
+
+        group_by = []
+        for facet in entry.get("group_by") or []:
+            facet = {"facet": facet} if isinstance(facet, str) else dict(facet)
+            if entry.get("facet_limit"):
+                facet.setdefault("limit", entry["facet_limit"])
+            if entry.get("sort"):
+                facet.setdefault("sort", entry["sort"])
+            group_by.append(facet)
+
+        compute_names, computes = [], []
+        for index, compute in enumerate(entry.get("computes") or DEFAULT_COMPUTES):
+            compute_names.append(compute.get("name") or f"c{index}")
+            payload = {key: compute[key] for key in _COMPUTE_KEYS if compute.get(key)}
+            payload.setdefault(
+                "type", COMPUTE_TIMESERIES if compute.get("interval") else COMPUTE_TOTAL
+            )
+            computes.append(payload)
+        if len(set(compute_names)) != len(compute_names):
+            raise ValueError(f"Compute names of aggregate query '{name}' must be unique: {compute_names}")
+
+        window = entry.get("window") or default_window
+        if window not in (WINDOW_MODE_DAILY, WINDOW_MODE_HOURLY):
+            raise ValueError(f"Aggregate query '{name}' has an unsupported window: {window}")
+
+        return cls(
+            name=name,
+            query=entry.get("query") or "*",
+            indexes=list(entry.get("indexes") or DEFAULT_INDEXES),
+            group_by=group_by,
+            compute_names=compute_names,
+            computes=computes,
+            window=window,
+        )
+
+    @property
+    def request_key(self) -> str:
+        """Return what a request must share with this query's requests to answer both."""
+        return json.dumps([self.query, self.indexes, self.group_by, self.window], sort_keys=True)
+
+
+class AggregateGroup:
+    """Queries answered by one request: shared buckets, each query's computes.
+
+    Computes that several queries ask for are only requested once.
+    """
+
+    def __init__(self, queries: Sequence[AggregateQuery]):
+        self.queries = list(queries)
+        self.computes: List[dict] = []
+        # For each query, the response key (`c<index>`) of each of its computes.
+        self._compute_keys: List[Dict[str, str]] = []
+        for query in self.queries:
+            keys = {}
+            for name, compute in zip(query.compute_names, query.computes):
+                if compute not in self.computes:
+                    self.computes.append(compute)
+                keys[name] = f"c{self.computes.index(compute)}"
+            self._compute_keys.append(keys)
+
+    @property
+    def name(self) -> str:
+        """Return the group's partition key: the names of its queries."""
+        return ",".join(query.name for query in self.queries)
+
+    @property
+    def window(self) -> str:
+        return self.queries[0].window
+
+    def payload(self, start: int, end: int, cursor: Optional[str] = None) -> dict:
+        """Return the body of the group's request for one window and page."""
+        first = self.queries[0]
+        return aggregate_payload(
+            first.query, first.indexes, first.group_by, self.computes, start, end, cursor
+        )
+
+    def split(self, bucket: dict) -> Iterable[Dict[str, Any]]:
+        """Yield one record per query from a bucket of the group's response."""
+        computes = bucket.get("computes") or {}
+        for query, keys in zip(self.queries, self._compute_keys):
+            yield {
+                "query_name": query.name,
+                "by": bucket.get("by"),
+                "computes": {name: computes.get(key) for name, key in keys.items()},
+            }
+
+
+def group_queries(queries: Sequence[AggregateQuery]) -> List[AggregateGroup]:
+    """Group queries into as few requests as possible, in the order they are configured."""
+    names = [query.name for query in queries]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Aggregate query names must be unique: {names}")
+    groups: Dict[str, List[AggregateQuery]] = {}
+    for query in queries:
+        groups.setdefault(query.request_key, []).append(query)
+    return [AggregateGroup(group) for group in groups.values()]
@@ -0,0 +1,162 @@
+"""On-disk cache of Datadog responses for closed time windows.
+
+Entries are keyed by a hash of the request method, URL (path and query
+parameters), body and API key, so organisations on the same site never share
+entries. Each entry is a `<key>.json` metadata file next to a
+`<key>.body` file holding the decoded response body. Reads refresh an entry's
+modification time, so size-based eviction removes the least recently used
+entries first.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Headers describing the original transfer, not the decoded body we store.
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class ResponseCache:
+    """Stores and replays successful responses on disk.
+
+    Args:
+        directory: Directory holding the cache entries.
+        ttl: Seconds an entry stays valid, or None to keep entries until evicted.
+        max_bytes: Total size the cache is trimmed to after each write, or None.
+        offline: If True, never go to the network; a miss is an error.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        offline: bool = False,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def key(request: requests.PreparedRequest) -> str:
+        """Return the cache key of a request."""
+        digest = hashlib.sha256()
+        digest.update((request.method or "").encode())
+        digest.update(b"\0")
+        digest.update((request.url or "").encode())
+        digest.update(b"\0")
+        body = request.body or b""
+        digest.update(body.encode() if isinstance(body, str) else body)
+        digest.update(b"\0")
+        digest.update((request.headers.get("DD-API-KEY") or "").encode())
+        return digest.hexdigest()
+
+    def _count(self, hit: bool) -> None:
+        # Streams and partitions share the cache, so `+=` alone could lose counts.
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _paths(self, key: str):
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+
+    def get(self, request: requests.PreparedRequest) -> Optional[requests.Response]:
+        """Return the cached response for a request, or None on a miss."""
+        meta_path, body_path = self._paths(self.key(request))
+        try:
+            meta = json.loads(meta_path.read_text())
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            self._count(hit=False)
+            return None
+
+        if self.ttl is not None and time.time() - meta["stored_at"] > self.ttl:
+            self._remove(meta_path, body_path)
+            self._count(hit=False)
+            return None
+
+        now = time.time()
+        for path in (meta_path, body_path):
+            os.utime(path, (now, now))
+        self._count(hit=True)
+
+        response = requests.Response()
+        response.status_code = meta["status_code"]
+        response.reason = meta.get("reason")
+        response.headers = CaseInsensitiveDict(meta["headers"])
+        response.encoding = meta.get("encoding")
+        response.url = meta["url"]
+        response.request = request
+        response.elapsed = timedelta(0)
+        response._content = body
+        response.from_cache = True
+        return response
+
+    def put(self, request: requests.PreparedRequest, response: requests.Response) -> None:
+        """Store a response; its body is read if it was streamed."""
+        key = self.key(request)
+        meta_path, body_path = self._paths(key)
+        meta = {
+            "stored_at": time.time(),
+            "status_code": response.status_code,
+            "reason": response.reason,
+            "encoding": response.encoding,
+            "url": response.url,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in _DROPPED_HEADERS
+            },
+        }
+        # Write to temporary files first so concurrent readers never see a partial entry.
+        tmp_path = self.directory / f"{key}.tmp{threading.get_ident()}"
+        tmp_path.write_bytes(response.content)
+        os.replace(tmp_path, body_path)
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, meta_path)
+        if self.max_bytes is not None:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits in `max_bytes`."""
+        with self._lock:
+            entries = []
+            total = 0
+            for meta_path in self.directory.glob("*.json"):
+                body_path = meta_path.with_suffix(".body")
+                try:
+                    size = meta_path.stat().st_size + body_path.stat().st_size
+                    used = body_path.stat().st_mtime
+                except OSError:
+                    continue
+                entries.append((used, size, meta_path, body_path))
+                total += size
+            for _, size, meta_path, body_path in sorted(entries):
+                if total <= (self.max_bytes or 0):
+                    break
+                self._remove(meta_path, body_path)
+                total -= size
+
+    @staticmethod
+    def _remove(*paths: Path) -> None:
+        for path in paths:
+            try:
+                path.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,133 @@
+"""Bounded concurrent fetching for tap-datadog streams."""
+
+import json
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_BUFFER_SIZE = 1000
+
+_DONE = object()
+
+
+class _Failure:
+    """Wraps an exception raised by a worker so it can be re-raised in order."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def partition_key(context: Optional[dict]) -> str:
+    """Return a stable key for a stream partition context."""
+    return json.dumps(context or {}, sort_keys=True, default=str)
+
+
+class OrderedPrefetcher:
+    """Fetch several keyed units of work on a thread pool, replaying them in order.
+
+    Units are submitted in the order given, up to `max_workers` ahead of the
+    unit being consumed: the next one is submitted as the consumer moves on.
+    Every submitted unit gets its own bounded queue of `buffer_size` items, so
+    at most `max_workers + 1` queues are held in memory (the one being drained
+    and those ahead of it), however many units there are. The unit being
+    consumed is always running or next to run, so the pool can never deadlock.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[Any], Iterable[Any]],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ):
+        self._fetch = fetch
+        self._max_workers = max(int(max_workers), 1)
+        self._buffer_size = buffer_size
+        self._queues: Dict[str, queue.Queue] = {}
+        self._unsubmitted: "OrderedDict[str, Any]" = OrderedDict()
+        self._futures: List[Future] = []
+        self._stop = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def pending(self) -> int:
+        """Return the number of units that have not been consumed yet."""
+        return len(self._queues) + len(self._unsubmitted)
+
+    @property
+    def submitted(self) -> int:
+        """Return the number of submitted units that have not been consumed yet."""
+        return len(self._queues)
+
+    def start(self, units: Iterable[Any]) -> None:
+        """Queue every unit and submit the first `max_workers` to the pool, in order."""
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._max_workers, thread_name_prefix="tap-datadog"
+        )
+        for unit in units:
+            self._unsubmitted[partition_key(unit)] = unit
+        self._submit_ahead()
+
+    def __contains__(self, unit: Any) -> bool:
+        key = partition_key(unit)
+        return key in self._queues or key in self._unsubmitted
+
+    def _submit(self, key: str, unit: Any) -> None:
+        self._queues[key] = queue.Queue(maxsize=self._buffer_size)
+        self._futures.append(self._executor.submit(self._run, unit, self._queues[key]))
+
+    def _submit_ahead(self) -> None:
+        while self._unsubmitted and len(self._queues) < self._max_workers:
+            self._submit(*self._unsubmitted.popitem(last=False))
+
+    def results(self, unit: Any) -> Iterator[Any]:
+        """Yield the items fetched for `unit`, blocking until they arrive."""
+        key = partition_key(unit)
+        if key in self._unsubmitted:
+            self._submit(key, self._unsubmitted.pop(key))
+        result_queue = self._queues.pop(key)
+        self._submit_ahead()
+        try:
+            while True:
+                item = result_queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        except BaseException:
+            self.shutdown()
+            raise
+        if not self.pending:
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        """Stop all workers and release the pool."""
+        self._stop.set()
+        for future in self._futures:
+            future.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._queues.clear()
+        self._unsubmitted.clear()
+
+    def _put(self, result_queue: queue.Queue, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                result_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, unit: Any, result_queue: queue.Queue) -> None:
+        try:
+            for item in self._fetch(unit):
+                if not self._put(result_queue, item):
+                    return
+            self._put(result_queue, _DONE)
+        except BaseException as ex:
+            self._put(result_queue, _Failure(ex))
+
@@ -0,0 +1,158 @@
+"""Per-stream and per-partition performance measurements of a sync.
+
+Streams record request latency, bytes received, parse time, rate-limit waits,
+retries and throughput into an `Instrumentation` shared by the tap. The
+measurements are logged as METRIC messages when a stream finishes and can be
+written out as one JSON run summary at exit.
+"""
+
+import atexit
+import json
+import logging
+import threading
+import time
+from array import array
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+from tap_datadog.concurrency import partition_key
+
+PERCENTILES = [50, 90, 99]
+
+
+class Histogram:
+    """Samples of one measurement, kept compactly for percentile summaries."""
+
+    def __init__(self):
+        self.values = array("d")
+
+    def observe(self, value: float) -> None:
+        self.values.append(value)
+
+    def merge(self, other: "Histogram") -> None:
+        self.values.extend(other.values)
+
+    def summary(self) -> Dict[str, float]:
+        """Return the count, sum, min, max, mean and percentiles of the samples."""
+        count = len(self.values)
+        if not count:
+            return {"count": 0}
+        ordered = sorted(self.values)
+        total = sum(ordered)
+        summary = {
+            "count": count,
+            "sum": total,
+            "min": ordered[0],
+            "max": ordered[-1],
+            "mean": total / count,
+        }
+        for percentile in PERCENTILES:
+            summary[f"p{percentile}"] = ordered[min(count - 1, count * percentile // 100)]
+        return summary
+
+
+class _Partition:
+    def __init__(self, context: Optional[dict]):
+        self.context = context
+        self.histograms: Dict[str, Histogram] = defaultdict(Histogram)
+        self.totals: Dict[str, float] = defaultdict(int)
+
+
+class Instrumentation:
+    """Thread-safe registry of the measurements of every stream and partition.
+
+    Measurements made without a partition context belong to the stream itself.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._partitions: Dict[Tuple[str, str], _Partition] = {}
+
+    def _partition(self, stream: str, context: Optional[dict]) -> _Partition:
+        key = (stream, partition_key(context or {}))
+        if key not in self._partitions:
+            self._partitions[key] = _Partition(context or None)
+        return self._partitions[key]
+
+    def observe(self, stream: str, context: Optional[dict], metric: str, value: float) -> None:
+        """Add a sample to a histogram."""
+        with self._lock:
+            self._partition(stream, context).histograms[metric].observe(value)
+
+    def add(self, stream: str, context: Optional[dict], metric: str, value: float = 1) -> None:
+        """Add to a total."""
+        with self._lock:
+            self._partition(stream, context).totals[metric] += value
+
+    def stream_summary(self, stream: str) -> Dict[str, Any]:
+        """Return the stream's merged histograms and totals, plus each partition's."""
+        histograms: Dict[str, Histogram] = defaultdict(Histogram)
+        totals: Dict[str, float] = defaultdict(int)
+        partitions = []
+        with self._lock:
+            for (name, _), partition in self._partitions.items():
+                if name != stream:
+                    continue
+                for metric, histogram in partition.histograms.items():
+                    histograms[metric].merge(histogram)
+                for metric, value in partition.totals.items():
+                    totals[metric] += value
+                if partition.context is not None:
+                    partitions.append(
+                        {
+                            "context": partition.context,
+                            "histograms": _summaries(partition.histograms),
+                            "totals": dict(partition.totals),
+                        }
+                    )
+        return {
+            "histograms": _summaries(histograms),
+            "totals": dict(totals),
+            "partitions": partitions,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the run summary of every stream."""
+        with self._lock:
+            streams = sorted({stream for stream, _ in self._partitions})
+        return {
+            "started_at": self.started,
+            "duration_seconds": time.time() - self.started,
+            "streams": {stream: self.stream_summary(stream) for stream in streams},
+        }
+
+    def write_summary(self, path: str) -> None:
+        """Write the run summary to `path` as JSON."""
+        with open(path, "w") as summary_file:
+            json.dump(self.summary(), summary_file, indent=2, sort_keys=True)
+
+
+def _summaries(histograms: Dict[str, Histogram]) -> Dict[str, Dict[str, float]]:
+    return {metric: histogram.summary() for metric, histogram in sorted(histograms.items())}
+
+
+def start_profiling(output_file: str) -> None:
+    """Trace the rest of the process with viztracer, saving the trace at exit.
+
+    viztracer is a development dependency: `poetry install --with dev`.
+    """
+    try:
+        from viztracer import VizTracer
+    except ImportError:
+        raise RuntimeError(
+            "profile_trace_path requires viztracer, a development dependency: "
+            "poetry install --with dev"
+        )
+
+    tracer = VizTracer(output_file=output_file, verbose=0)
+    tracer.start()
+
+    def save() -> None:
+        tracer.stop()
+        tracer.save()
+        logging.getLogger(__name__).info(
+            "Saved profile trace to %s (open with vizviewer).", output_file
+        )
+
+    atexit.register(save)
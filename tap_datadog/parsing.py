@@ -0,0 +1,59 @@
+"""Incremental JSON parsing of large Datadog responses.
+
+Uses `ijson` when it is installed, preferring its C (yajl2) backends.
+"""
+
+from typing import Any, Dict, IO, Iterable, Iterator, Sequence, Tuple
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None
+
+IJSON_BACKENDS = ["yajl2_c", "yajl2_cffi", "yajl2", "python"]
+SCALAR_EVENTS = {"null", "boolean", "integer", "double", "number", "string"}
+
+_backend = None
+
+
+def get_ijson_backend() -> Any:
+    """Return the fastest installed ijson backend, or None without ijson."""
+    global _backend
+    if ijson is None:
+        return None
+    if _backend is None:
+        for name in IJSON_BACKENDS:
+            try:
+                _backend = ijson.get_backend(name)
+                break
+            except ImportError:
+                continue
+    return _backend
+
+
+class StreamingItems:
+    """Iterate the items found at `prefix` of a JSON document as its bytes arrive.
+
+    Scalar values found at any of the `capture` prefixes are collected in
+    `captured` along the way. Values that appear after the last item are only
+    available once iteration has finished.
+    """
+
+    def __init__(self, fileobj: IO[bytes], prefix: str, capture: Sequence[str] = ()):
+        self._fileobj = fileobj
+        self._prefix = prefix
+        self._capture = set(capture)
+        self.captured: Dict[str, Any] = {}
+
+    def _capture_events(
+        self, events: Iterable[Tuple[str, str, Any]]
+    ) -> Iterator[Tuple[str, str, Any]]:
+        for path, event, value in events:
+            if path in self._capture and event in SCALAR_EVENTS:
+                self.captured[path] = value
+            yield path, event, value
+
+    def __iter__(self) -> Iterator[Any]:
+        backend = get_ijson_backend()
+        events = self._capture_events(backend.parse(self._fileobj, use_float=True))
+        yield from backend.items(events, self._prefix)
@@ -0,0 +1,63 @@
+"""Output formats for metric query `pointlist` series."""
+
+from typing import Iterator, List, Optional, Tuple
+
+METRIC_OUTPUT_NESTED = "nested"
+METRIC_OUTPUT_COLUMNAR = "columnar"
+METRIC_OUTPUT_POINTS = "points"
+METRIC_OUTPUTS = [METRIC_OUTPUT_NESTED, METRIC_OUTPUT_COLUMNAR, METRIC_OUTPUT_POINTS]
+
+SERIES_PROPERTIES = ["metric", "scope", "expression", "tag_set", "aggregation", "interval", "query_index"]
+
+
+def series_columns(series: dict) -> Tuple[List[int], List[Optional[float]]]:
+    """Return the timestamps and values of a `pointlist` or columnar series."""
+    if "pointlist" not in series and "timestamps" in series:
+        return [int(timestamp) for timestamp in series["timestamps"]], series.get("values") or []
+    pointlist = series.get("pointlist") or []
+    return [int(point[0]) for point in pointlist], [point[1] for point in pointlist]
+
+
+def columnar_series(series: dict) -> dict:
+    """Return a series with parallel `timestamps`/`values` instead of `pointlist`."""
+    result = {key: value for key, value in series.items() if key != "pointlist"}
+    result["timestamps"], result["values"] = series_columns(series)
+    return result
+
+
+def nested_series(series: dict) -> dict:
+    """Return a series with `[timestamp, value]` pairs in `pointlist`."""
+    if "pointlist" in series or "timestamps" not in series:
+        return series
+    result = {key: value for key, value in series.items() if key not in ("timestamps", "values")}
+    result["pointlist"] = [list(point) for point in zip(*series_columns(series))]
+    return result
+
+
+def point_records(record: dict) -> Iterator[dict]:
+    """Yield one record per point, carrying the response and series fields."""
+    top = {key: value for key, value in record.items() if key != "series"}
+    for series in record.get("series") or []:
+        base = dict(top)
+        for key in SERIES_PROPERTIES:
+            if key in series:
+                base[key] = series[key]
+        for timestamp, value in zip(*series_columns(series)):
+            yield {**base, "timestamp": timestamp, "value": value}
+
+
+def format_metric_record(record: dict, output: str) -> Iterator[dict]:
+    """Yield the record(s) for a metric query response in the given output format.
+
+    Series may hold either a `pointlist` (`/api/v1/query`) or `timestamps` and
+    `values` columns (`/api/v2/query/timeseries`).
+    """
+    series = record.get("series") or []
+    if output == METRIC_OUTPUT_POINTS:
+        yield from point_records(record)
+    elif output == METRIC_OUTPUT_COLUMNAR:
+        yield {**record, "series": [columnar_series(item) for item in series]}
+    elif any("pointlist" not in item for item in series):
+        yield {**record, "series": [nested_series(item) for item in series]}
+    else:
+        yield record
@@ -0,0 +1,100 @@
+"""Metric query expressions for the `/api/v1/query` endpoint."""
+
+import re
+from typing import List, Optional, Sequence, Tuple
+
+DEFAULT_METRIC_QUERIES = ["trace.aspnet.request.duration{env:production}"]
+
+# Keeps the `query` URL parameter of a batch well below common URL length limits.
+MAX_QUERY_LENGTH = 4000
+
+
+# A function applied to a metric query, e.g. `.rollup(`, `.as_count(` or `.fill(`.
+_FUNCTION_CALL = re.compile(r"\.[A-Za-z_]+\(")
+# A metric term of an expression: optional space aggregator, metric name and `{...}` scope.
+_METRIC_TERM = re.compile(r"(?:[a-z]+:)?[A-Za-z0-9_.]+\{[^{}]*\}")
+# What may follow a term's scope: a `by {...}` clause, then a chain of functions.
+_GROUP_BY = re.compile(r"\s*by\s*\{[^{}]*\}")
+_FUNCTION_CHAIN = re.compile(r"(?:\.[A-Za-z_]+\([^()]*\))*")
+
+
+def _metric_terms(expression: str) -> List[Tuple[int, bool, int, bool]]:
+    """Return where each metric term's group-by and rollup go, and whether it has them.
+
+    Terms are listed last first, so inserting at their positions in that order
+    leaves the positions of the terms still to be edited unchanged.
+    """
+    terms = []
+    for term in _METRIC_TERM.finditer(expression):
+        group_by = _GROUP_BY.match(expression, term.end())
+        chain = _FUNCTION_CHAIN.match(expression, group_by.end() if group_by else term.end())
+        terms.append((term.end(), group_by is not None, chain.end(), ".rollup(" in chain.group()))
+    if not terms:
+        # A lone metric without a scope: group by before its first function.
+        function = _FUNCTION_CALL.search(expression)
+        terms.append(
+            (
+                function.start() if function else len(expression),
+                " by {" in expression,
+                len(expression),
+                ".rollup(" in expression,
+            )
+        )
+    return terms[::-1]
+
+
+def build_metric_query(
+    query: str,
+    group_by: Optional[Sequence[str]] = None,
+    rollup_function: Optional[str] = None,
+    rollup_interval: Optional[int] = None,
+) -> str:
+    """Return a query expression with the group-by tags and rollup applied.
+
+    In arithmetic such as `a{x} / b{y}`, they are applied to every metric term,
+    so the terms' series still line up. Terms that already have a `by {...}`
+    clause or a `.rollup(...)` call are left as they are, so individual queries
+    can override the defaults.
+    """
+    expression = query.strip()
+    clause = f" by {{{','.join(group_by)}}}" if group_by else ""
+    rollup = ""
+    if rollup_function or rollup_interval:
+        args = [rollup_function or "avg"]
+        if rollup_interval:
+            args.append(str(int(rollup_interval)))
+        rollup = f".rollup({', '.join(args)})"
+    for scope_end, has_group_by, chain_end, has_rollup in _metric_terms(expression):
+        if rollup and not has_rollup:
+            expression = expression[:chain_end] + rollup + expression[chain_end:]
+        if clause and not has_group_by:
+            expression = expression[:scope_end] + clause + expression[scope_end:]
+    return expression
+
+
+def batch_queries(
+    queries: Sequence[str],
+    max_length: int = MAX_QUERY_LENGTH,
+    max_count: Optional[int] = None,
+) -> List[List[str]]:
+    """Group query expressions into as few batches as possible.
+
+    Datadog evaluates every expression of a comma-separated `query` in one call
+    and tags each returned series with its `query_index`. A batch only grows
+    while its comma-joined length stays within `max_length` characters and it
+    holds at most `max_count` queries; longer expressions get a batch of their own.
+    """
+    batches: List[List[str]] = []
+    length = 0
+    for query in queries:
+        if (
+            batches
+            and length + 1 + len(query) <= max_length
+            and (max_count is None or len(batches[-1]) < max_count)
+        ):
+            batches[-1].append(query)
+            length += 1 + len(query)
+        else:
+            batches.append([query])
+            length = len(query)
+    return batches
@@ -0,0 +1,132 @@
+"""Rate-limit-aware request scheduling shared by all tap-datadog streams.
+
+Datadog reports its limits per endpoint family with the ``X-RateLimit-Limit``,
+``X-RateLimit-Period``, ``X-RateLimit-Remaining`` and ``X-RateLimit-Reset``
+response headers. Each family gets a token bucket refilled at limit / period,
+so requests are spread over the period instead of bursting into a 429.
+"""
+
+import collections
+import threading
+import time
+from typing import Callable, Dict, Mapping, Optional
+
+LIMIT_HEADER = "X-RateLimit-Limit"
+PERIOD_HEADER = "X-RateLimit-Period"
+REMAINING_HEADER = "X-RateLimit-Remaining"
+RESET_HEADER = "X-RateLimit-Reset"
+
+
+def _header(headers: Optional[Mapping[str, str]], name: str) -> Optional[float]:
+    value = (headers or {}).get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Token bucket for one endpoint family.
+
+    The limit is unknown until the first response, so the family's first
+    request is sent alone and the others wait for `update` to size the bucket.
+    Families whose responses carry no rate-limit headers are not paced after
+    that. Waiting requests are served strictly first come, first served, so
+    streams sharing a family get fair access.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._waiting: collections.deque = collections.deque()
+        self.capacity: Optional[float] = None
+        self.refill_rate: Optional[float] = None
+        self.tokens = 0.0
+        self.blocked_until = 0.0
+        self._refilled_at = clock()
+        self._updated = False
+        self._probing = False
+
+    def _refill(self, now: float) -> None:
+        if self.refill_rate is not None and self.capacity is not None:
+            elapsed = max(now - self._refilled_at, 0.0)
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self._refilled_at = now
+
+    def _wait_time(self, now: float) -> Optional[float]:
+        if self._probing:
+            return None
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.refill_rate is None or self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.refill_rate
+
+    def acquire(self) -> float:
+        """Block until a request may be sent; return the seconds spent waiting."""
+        ticket = object()
+        started = self._clock()
+        with self._condition:
+            self._waiting.append(ticket)
+            while True:
+                now = self._clock()
+                self._refill(now)
+                wait = self._wait_time(now)
+                if self._waiting[0] is ticket and wait is not None and wait <= 0:
+                    break
+                self._condition.wait(wait if self._waiting[0] is ticket else None)
+            self._waiting.popleft()
+            self._probing = not self._updated
+            if self.refill_rate is not None:
+                self.tokens -= 1
+            self._condition.notify_all()
+        return self._clock() - started
+
+    def update(self, headers: Optional[Mapping[str, str]]) -> None:
+        """Adjust the bucket to the rate-limit headers of a response.
+
+        Call it after every request, with None if no response was received.
+        """
+        limit = _header(headers, LIMIT_HEADER)
+        period = _header(headers, PERIOD_HEADER)
+        remaining = _header(headers, REMAINING_HEADER)
+        reset = _header(headers, RESET_HEADER)
+        with self._condition:
+            now = self._clock()
+            self._refill(now)
+            self._updated = self._updated or headers is not None
+            self._probing = False
+            if limit and period:
+                if self.capacity is None:
+                    self.tokens = limit
+                self.capacity = limit
+                self.refill_rate = limit / period
+            if remaining is not None and self.refill_rate is not None:
+                self.tokens = min(self.tokens, remaining)
+            if remaining is not None and remaining <= 0 and reset:
+                self.block(reset, now)
+            self._condition.notify_all()
+
+    def block(self, seconds: float, now: Optional[float] = None) -> None:
+        """Hold every request for `seconds`, e.g. after a 429 response."""
+        with self._condition:
+            now = self._clock() if now is None else now
+            self.tokens = min(self.tokens, 0.0)
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self._condition.notify_all()
+
+
+class RateLimitScheduler:
+    """Hands out one token bucket per endpoint family, shared across streams."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, family: str) -> TokenBucket:
+        """Return the bucket for an endpoint family, creating it if needed."""
+        with self._lock:
+            if family not in self._buckets:
+                self._buckets[family] = TokenBucket(self._clock)
+            return self._buckets[family]
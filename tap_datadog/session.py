@@ -0,0 +1,70 @@
+"""Pooled HTTP session shared by all tap-datadog streams."""
+
+import socket
+from typing import Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+DEFAULT_POOL_SIZE = 10
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTP adapter that enables TCP keep-alive on pooled connections."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+def build_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Return a session whose connections are reused across streams and partitions."""
+    session = requests.Session()
+    adapter = KeepAliveAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    session.headers["Connection"] = "keep-alive"
+    return session
+
+
+def connection_stats(session: requests.Session) -> List[Dict[str, int]]:
+    """Return opened and reused connection counts for every host the session used."""
+    stats = []
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for pool in [pools[key] for key in pools.keys()]:
+            stats.append(
+                {
+                    "host": pool.host,
+                    "requests": pool.num_requests,
+                    "connections_opened": pool.num_connections,
+                    "connections_reused": pool.num_requests - pool.num_connections,
+                }
+            )
+    return stats
+
+
+def connection_stats_since(
+    session: requests.Session, before: List[Dict[str, int]]
+) -> List[Dict[str, int]]:
+    """Return `connection_stats` of the requests sent since `before` was taken.
+
+    Hosts the session sent no request to in the meantime are left out.
+    """
+    previous = {stats["host"]: stats for stats in before}
+    since = []
+    for stats in connection_stats(session):
+        base = previous.get(stats["host"], {})
+        counts = {
+            name: max(value - base.get(name, 0), 0)
+            for name, value in stats.items()
+            if name != "host"
+        }
+        if counts["requests"]:
+            since.append({"host": stats["host"], **counts})
+    return since
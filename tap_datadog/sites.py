@@ -0,0 +1,67 @@
+"""Datadog sites (regions) and organisations the tap extracts from."""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+DEFAULT_SITE = "datadoghq.com"
+
+
+def site_url(site: str) -> str:
+    """Return the API base URL of a Datadog site, e.g. `datadoghq.eu`."""
+    return f"https://api.{site}"
+
+
+@dataclass
+class Site:
+    """One Datadog organisation: the API it lives on and its keys.
+
+    `options` holds per-site overrides of stream settings, such as
+    `slo_ids` or `aggregate_logs_hosts`.
+    """
+
+    name: str
+    url: str
+    api_key: str
+    app_key: str
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def auth_headers(self) -> Dict[str, str]:
+        return {"DD-API-KEY": self.api_key, "DD-APPLICATION-KEY": self.app_key}
+
+    def setting(self, config: dict, key: str, default: Any = None) -> Any:
+        """Return the site's own value of a setting, else the tap config's."""
+        if key in self.options:
+            return self.options[key]
+        return config.get(key, default)
+
+
+def load_sites(config: dict) -> List[Site]:
+    """Return the sites of a tap config.
+
+    Without `sites`, the tap extracts from the single organisation given by
+    `site` (or `api_url`), `api_key` and `app_key`. Each `sites` entry may set
+    its own `site`, `api_url`, keys and stream options; keys default to the
+    top-level ones.
+    """
+    entries = config.get("sites") or [
+        {"site": config.get("site") or DEFAULT_SITE, "api_url": config.get("api_url")}
+    ]
+    sites = []
+    for entry in entries:
+        site = entry.get("site") or DEFAULT_SITE
+        name = entry.get("name") or site
+        api_key = entry.get("api_key") or config.get("api_key")
+        app_key = entry.get("app_key") or config.get("app_key")
+        if not api_key or not app_key:
+            raise ValueError(f"Datadog site '{name}' has no api_key and app_key.")
+        options = {
+            key: value
+            for key, value in entry.items()
+            if key not in ("name", "site", "api_url", "api_key", "app_key")
+        }
+        sites.append(Site(name, entry.get("api_url") or site_url(site), api_key, app_key, options))
+    names = [site.name for site in sites]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Datadog site names must be unique: {names}")
+    return sites
@@ -1,37 +1,103 @@
 """Stream class for tap-datadog."""
-from doctest import FAIL_FAST
-import logging
-import sys
-
-import base64
-import calendar
+import io
 import json
 import time
-from datetime import datetime, timedelta, timezone
-from typing import Dict, Optional, Any, Iterable
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any, Iterable, Sequence, Tuple
 from pathlib import Path
-from singer_sdk import typing
 from functools import cached_property
-from singer_sdk import typing as th
 from singer_sdk.streams import RESTStream
 from singer_sdk.authenticators import SimpleAuthenticator
+from singer_sdk.exceptions import FatalAPIError, RetriableAPIError
+from singer_sdk.mapper import SameRecordTransform
 
-from singer_sdk import Tap, Stream
+from singer_sdk import Tap
 
+import backoff
 import requests
 
-logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+from tap_datadog.aggregates import (
+    DEFAULT_INDEXES,
+    AggregateGroup,
+    AggregateQuery,
+    aggregate_payload,
+    group_queries,
+)
+from tap_datadog.batches import BatchWriter
+from tap_datadog.concurrency import DEFAULT_MAX_WORKERS, OrderedPrefetcher
+from tap_datadog.parsing import StreamingItems, get_ijson_backend
+from tap_datadog.pointlists import METRIC_OUTPUT_NESTED, format_metric_record
+from tap_datadog.queries import DEFAULT_METRIC_QUERIES, batch_queries, build_metric_query
+from tap_datadog.ratelimit import RESET_HEADER, TokenBucket
+from tap_datadog.serialization import (
+    DEFAULT_VALIDATION_SAMPLE_RATE,
+    VALIDATION_OFF,
+    RecordFormatter,
+)
+from tap_datadog.session import connection_stats, connection_stats_since
+from tap_datadog.sites import Site
+from tap_datadog.timeseries import (
+    TIMESERIES_BATCH_SIZE,
+    TIMESERIES_PATH,
+    timeseries_payload,
+    timeseries_record,
+    with_aggregator,
+)
+from tap_datadog.windows import (
+    SECONDS_PER_DAY,
+    WINDOW_MODE_DAILY,
+    WINDOW_MODE_HOURLY,
+    WINDOW_MODE_MONTH_TO_DATE,
+    Checkpoint,
+    Window,
+    closed_days_end,
+    closed_hours_end,
+    first_of_month_epoch,
+    parse_start_date,
+    plan_windows,
+    slice_windows,
+    to_epoch_seconds,
+)
 
 SCHEMAS_DIR = Path(__file__).parent / Path("./schemas")
 
+
+def response_size(response: requests.Response) -> int:
+    """Return the bytes received for a response, compressed as sent by the server."""
+    if not getattr(response, "from_cache", False):
+        try:
+            return response.raw.tell()
+        except AttributeError:
+            pass
+    return len(response.content)
+
 class TapDatadogStream(RESTStream):
     """Datadog stream class."""
     
     _LOG_REQUEST_METRIC_URLS: bool = True
+    _prefetcher: Optional[OrderedPrefetcher] = None
+    _record_write_seconds: float = 0.0
+    _state_deferred: bool = False
+    # Session and cache counters when the stream started, see `_sync_records`.
+    _connection_baseline: List[Dict[str, int]] = []
+    _cache_baseline: Tuple[int, int] = (0, 0)
+
+    # Whether records may be written to batch files when batch_config is set
+    supports_batch_messages: bool = False
+
+    # ijson prefix of the records and scalars to keep when streaming_json is on
+    streaming_records_prefix: Optional[str] = None
+    streaming_capture: List[str] = []
+
     @property
     def url_base(self) -> str:
-        """Base URL of source"""
-        return f"https://api.datadoghq.com"
+        """Base URL of the first configured site; see `get_url` for the others."""
+        return self._tap.sites[0].url
+
+    @property
+    def requests_session(self) -> requests.Session:
+        """Return the pooled session shared by all streams, created on first use."""
+        return self._tap.requests_session
 
     @property
     def http_headers(self) -> dict:
@@ -41,460 +107,1068 @@ class TapDatadogStream(RESTStream):
         headers["Accept"] = "application/json"
         return headers
 
-    @property
+    @cached_property
     def authenticator(self):
-        http_headers = {}
-
-        # If only api_token is provided, use "Basic xyzabcdlmnopqrszyzabcdefgh" authentication
-        http_headers["DD-API-KEY"] = self.config.get("api_key")
-        http_headers["DD-APPLICATION-KEY"] = self.config.get("app_key")
-
-        return SimpleAuthenticator(stream=self, auth_headers=http_headers)
-
-
-class AggregateLogs(TapDatadogStream):
-
-    def __init__(self, tap: Tap):
-        super().__init__(tap)
-        self.logger = logging.getLogger(__name__)
-
-        self.current_host = 0 
-        self.host = [
-            "api.degreed.com",
-            "api.eu.degreed.com",
-            "api.ca.degreed.com"
+        """Authenticate as the first configured site; see `prepare_request` for the others."""
+        return SimpleAuthenticator(stream=self, auth_headers=self._tap.sites[0].auth_headers)
+
+    def site_for(self, context: Optional[dict]) -> Site:
+        """Return the site a partition or request context belongs to."""
+        name = (context or {}).get("site")
+        for site in self._tap.sites:
+            if site.name == name:
+                return site
+        return self._tap.sites[0]
+
+    @cached_property
+    def partitions(self) -> Optional[List[dict]]:
+        """Return the partitions of every site, tagged with `site` when there are several.
+
+        Sites are extracted concurrently like any other partitions, up to `max_workers`.
+        """
+        sites = self._tap.sites
+        if not self._tap.multi_site:
+            return self.site_partitions(sites[0])
+        return [
+            {"site": site.name, **partition}
+            for site in sites
+            for partition in self.site_partitions(site) or [{}]
         ]
 
-    name = "aggregate_logs" # Stream name 
-    path = "/api/v2/logs/analytics/aggregate" # API endpoint after base_url 
-    rest_method = "POST"
-    #primary_keys = ["id"]
-
-    records_jsonpath = "$.data.buckets.[*]" # https://jsonpath.com Use requests response json to identify the json path 
-    replication_key = None
-    schema_filepath = SCHEMAS_DIR / "aggregate_logs.json"  # Optional: use schema_filepath with .json inside schemas/ 
-
-    def prepare_request_payload(
-        self, context: Optional[dict], next_page_token: Optional[Any]
-    ) -> Optional[dict]:
-        """Define request parameters to return"""
-
-        todayUTC = datetime.now(timezone.utc).date()
-        yesterdayUTC = todayUTC - timedelta(1)
-        
-        from_date = f"{yesterdayUTC}T00:00:00+03:00"
-        to_date = f"{yesterdayUTC}T23:12:59+03:00"
-
-        payload = {"compute": [{"aggregation": "count", "type": "total" }, { "aggregation": "sum", "type": "total", "metric": "@Properties.Elapsed" } ], "filter": { "query": "source:degreed.api @MessageTemplate:\"HTTP {RequestMethod} {RequestPath} responded {StatusCode} in {Elapsed:0.0000} ms\" host: " + self.host[self.current_host], "from": from_date, "to": to_date, "indexes": [ "main" ] }, "group_by": [ { "facet": "@http.status_code" }, { "facet": "@Properties.OrganizationId" }, { "facet": "@Properties.PathTemplate" }, { "facet": "@Properties.RequestMethod" } ] }
+    def site_partitions(self, site: Site) -> Optional[List[dict]]:
+        """Return the stream's partitions within one site, or None if it has none."""
+        return None
 
-        return payload
+    def get_url(self, context: Optional[dict]) -> str:
+        """Return the URL on the context's site."""
+        url = super().get_url(context)
+        return self.site_for(context).url + url[len(self.url_base):]
 
-    def post_process(self, row: dict, context: Optional[dict]) -> dict:
-        row["host_name"] = self.host[self.current_host]
-        return row
+    @property
+    def max_workers(self) -> int:
+        """Return the number of partitions or slices fetched concurrently."""
+        return self.config.get("max_workers", DEFAULT_MAX_WORKERS)
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Return records, fetching every partition concurrently.
+
+        Partitions are still emitted one after another in their declared order,
+        so output stays deterministic. Checkpoints are applied here, after the
+        records before them have been written.
+        """
+        for item in self._partition_records(context):
+            if isinstance(item, Checkpoint):
+                self.checkpoint(context, item.value)
+            else:
+                yield item
+
+    def _partition_records(self, context: Optional[dict]) -> Iterable[Any]:
+        partitions = self.partitions
+        if context is None or not partitions or context not in partitions or self.max_workers < 2:
+            return self._measured_records(context)
+
+        if self._prefetcher is None or context not in self._prefetcher:
+            if self._prefetcher is not None:
+                self._prefetcher.shutdown()
+            pending = partitions[partitions.index(context):]
+            # The SDK only reads a partition's bookmark when its turn comes, so
+            # read them now for the partitions that start early.
+            for partition in pending:
+                self._write_starting_replication_value(partition)
+            self._prefetcher = OrderedPrefetcher(self._measured_records, self.max_workers)
+            self._prefetcher.start(pending)
+        return self._prefetcher.results(context)
+
+    def checkpoint(self, context: Optional[dict], value: Any) -> None:
+        """Move the partition's bookmark to `value` and emit a STATE message."""
+        state = self.get_context_state(context)
+        state["replication_key"] = self.replication_key
+        state["replication_key_value"] = value
+        self._write_state_message()
+
+    def _measured_records(self, context: Optional[dict]) -> Iterable[Any]:
+        """Yield a partition's records and checkpoints, recording its record count and throughput."""
+        instrumentation = self._tap.instrumentation
+        started = time.perf_counter()
+        record_count = 0
+        site_name = self.site_for(context).name
+        for record in self.request_records(context):
+            if isinstance(record, Checkpoint):
+                yield record
+                continue
+            record = self.post_process(record, context)
+            if record is None:
+                continue
+            record["site"] = site_name
+            record_count += 1
+            yield record
+        elapsed = time.perf_counter() - started
+        instrumentation.add(self.name, context, "records", record_count)
+        instrumentation.add(self.name, context, "partition_seconds", elapsed)
+        if elapsed > 0:
+            instrumentation.observe(self.name, context, "records_per_second", record_count / elapsed)
+
+    def instrumented_context(self, context: Optional[dict]) -> Optional[dict]:
+        """Return the partition a request context belongs to, dropping request-only keys."""
+        partitions = self.partitions
+        if not context or not partitions:
+            return None
+        return {key: context[key] for key in partitions[0] if key in context}
+
+    def rate_limit_family(self, context: Optional[dict]) -> str:
+        """Return the key of the Datadog rate limit a context's requests count against.
+
+        Rate limits are per organisation, so each site has its own.
+        """
+        return f"{self.site_for(context).url}{self.path}"
+
+    def rate_limit_bucket(self, context: Optional[dict]) -> TokenBucket:
+        """Return the token bucket shared by every stream of the same site and endpoint family."""
+        return self._tap.rate_limit_scheduler.bucket(self.rate_limit_family(context))
+
+    def _request(
+        self, prepared_request: requests.PreparedRequest, context: Optional[dict]
+    ) -> requests.Response:
+        """Send a request once the endpoint family's rate limit allows it.
+
+        Closed windows are served from and stored in the response cache, if enabled.
+        """
+        cache = self._tap.response_cache
+        if cache is not None:
+            cached = cache.get(prepared_request)
+            if cached is not None:
+                return cached
+            if cache.offline:
+                raise FatalAPIError(
+                    f"No cached response for {prepared_request.url} in offline replay mode."
+                )
 
+        instrumentation = self._tap.instrumentation
+        partition = self.instrumented_context(context)
+        bucket = self.rate_limit_bucket(context)
+        waited = bucket.acquire()
+        instrumentation.observe(self.name, partition, "rate_limit_wait_seconds", waited)
+        stream = self.stream_response and cache is None
+        started = time.perf_counter()
+        try:
+            response = self.requests_session.send(
+                prepared_request, timeout=self.timeout, stream=stream
+            )
+        except requests.exceptions.RequestException:
+            bucket.update(None)
+            raise
+        instrumentation.observe(
+            self.name, partition, "request_seconds", time.perf_counter() - started
+        )
+        response.streamed = stream
+        response.rate_limit_bucket = bucket
+        bucket.update(response.headers)
+        if self._LOG_REQUEST_METRICS:
+            extra_tags = {}
+            if self._LOG_REQUEST_METRIC_URLS:
+                extra_tags["url"] = prepared_request.path_url
+            self._write_request_duration_log(
+                endpoint=self.path,
+                response=response,
+                context=context,
+                extra_tags=extra_tags,
+            )
+        self.validate_response(response)
+        if cache is not None and self.is_cacheable(prepared_request):
+            cache.put(prepared_request, response)
+        return response
+
+    def request_decorator(self, func):
+        """Retry like the SDK, counting each retry in the instrumentation."""
+        return backoff.on_exception(
+            backoff.expo,
+            (RetriableAPIError, requests.exceptions.ReadTimeout),
+            max_tries=5,
+            factor=2,
+            on_backoff=self._record_retry,
+        )(func)
+
+    def _record_retry(self, details: dict) -> None:
+        context = details["args"][1] if len(details["args"]) > 1 else None
+        self._tap.instrumentation.add(self.name, self.instrumented_context(context), "retries")
+
+    def parse_measured(self, response: requests.Response, context: Optional[dict]) -> Iterable[dict]:
+        """Parse a response, recording parse time and bytes received.
+
+        Parse time excludes the time spent by consumers of the records. For
+        streamed responses it includes reading the body from the network.
+        """
+        partition = self.instrumented_context(context)
+        parse_seconds = 0.0
+        records = iter(self.parse_response(response))
+        while True:
+            started = time.perf_counter()
+            try:
+                row = next(records)
+            except StopIteration:
+                break
+            finally:
+                parse_seconds += time.perf_counter() - started
+            yield row
+        instrumentation = self._tap.instrumentation
+        instrumentation.observe(self.name, partition, "parse_seconds", parse_seconds)
+        instrumentation.observe(self.name, partition, "bytes_received", response_size(response))
+
+    def prepare_request(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> requests.PreparedRequest:
+        """Prepare a request to the context's site, noting until when the data it asks for can change."""
+        request = super().prepare_request(context, next_page_token)
+        request.headers.update(self.site_for(context).auth_headers)
+        request.cache_until = self.get_cache_until(context, next_page_token)
+        return request
+
+    def get_cache_until(self, context: Optional[dict], next_page_token: Optional[Any]) -> Optional[int]:
+        """Return the epoch the requested data ends at, or None if it must not be cached."""
+        return None
+
+    def is_cacheable(self, prepared_request: requests.PreparedRequest) -> bool:
+        """Return True if the request only covers closed days."""
+        cache_until = getattr(prepared_request, "cache_until", None)
+        return cache_until is not None and cache_until <= closed_days_end()
 
-    def get_next_page_token(
-        self, response: requests.Response, previous_token: Optional[Any]
-    ) -> Optional[Any]:
-        """Return a token for identifying next page or None if no more pages."""
-        if self.current_host != len(self.host) - 1:
-            self.current_host += 1
-            return self.current_host
+    @property
+    def stream_response(self) -> bool:
+        """Return True if responses are parsed incrementally as bytes arrive."""
+        return bool(
+            self.config.get("streaming_json")
+            and self.streaming_records_prefix
+            and get_ijson_backend()
+        )
+
+    def parse_response(self, response: requests.Response) -> Iterable[dict]:
+        """Parse the response, incrementally when `streaming_json` is enabled.
+
+        Streamed responses keep the scalars listed in `streaming_capture` in
+        `response.streamed_values`.
+        """
+        if not self.stream_response:
+            yield from super().parse_response(response)
+            return
+
+        if getattr(response, "streamed", False):
+            response.raw.decode_content = True
+            body = response.raw
         else:
+            body = io.BytesIO(response.content)
+        items = StreamingItems(body, self.streaming_records_prefix, self.streaming_capture)
+        response.streamed_values = items.captured
+        yield from items
+
+    @cached_property
+    def record_formatter(self) -> Optional[RecordFormatter]:
+        """Return the compiled fast record path, or None to use the SDK's.
+
+        The fast path needs `fast_records`, no stream maps and no deselected
+        nested properties.
+        """
+        if not self.config.get("fast_records"):
             return None
-        
-class Metric_Response_Time(TapDatadogStream):        
- 
-    def __init__(self, tap: Tap):
-        super().__init__(tap)
-        self.logger = logging.getLogger(__name__)
-
-        self.configuration_start_date = self.config["start_date"]
-        self.get_next_page_token_epoch = 0
-        self.end_of_month_limit_epoch = 0
-        self.replication_key_value = 0
-        self.first_run = True
-        self.slo_date_overreach = False
-        
-    name = "metric_response_time" # Stream name 
-    path = f"/api/v1/query"
-    rest_method = "GET"
-    
-    #records_jsonpath = "$." 
-    next_page_token = 0
-    schema = th.PropertiesList(
-        th.Property("schema", th.StringType),
-        th.Property("resp_version", th.NumberType),
-        th.Property(
-            "series",
-            th.ArrayType(
-                th.ObjectType(
-                        th.Property("metric", th.StringType),
-                        th.Property("scope", th.StringType),
-                        th.Property("pointlist", th.ArrayType(th.ArrayType(th.NumberType)),
-                        th.Property("expression", th.StringType),
-                    )
+        if len(self.stream_maps) != 1 or not isinstance(self.stream_maps[0], SameRecordTransform):
+            return None
+        mask = self.mask
+        if any(len(breadcrumb) > 2 and not selected for breadcrumb, selected in mask.items()):
+            return None
+        selected = frozenset(
+            name for name in self.schema["properties"] if mask.get(("properties", name), True)
+        )
+        return RecordFormatter(
+            self.name,
+            self.schema,
+            selected,
+            validation=self.config.get("record_validation", VALIDATION_OFF),
+            sample_rate=self.config.get("record_validation_sample_rate", DEFAULT_VALIDATION_SAMPLE_RATE),
+            logger=self.logger,
+        )
+
+    @cached_property
+    def batch_writers(self) -> Optional[Dict[str, BatchWriter]]:
+        """Return the batch file writers by output stream, or None to write RECORD messages."""
+        batch_config = self._tap.batch_config
+        if batch_config is None or not self.supports_batch_messages:
+            return None
+        return {}
+
+    def _write_record_message(self, record: dict) -> None:
+        """Write a RECORD message, timing conforming, mapping and serialising it."""
+        started = time.perf_counter()
+        formatter = self.record_formatter
+        if self.batch_writers is not None:
+            self._write_batch_record(record)
+        elif formatter is None:
+            super()._write_record_message(record)
+        else:
+            self._tap.record_writer.write_record(self.name, formatter.conform(record))
+        self._record_write_seconds += time.perf_counter() - started
+
+    def _write_batch_record(self, record: dict) -> None:
+        """Add a record to the current batch file, emitting BATCH once it is full."""
+        formatter = self.record_formatter
+        if formatter is not None:
+            outputs = [(self.name, formatter.conform(record))]
+        else:
+            outputs = [
+                (message.stream, message.record)
+                for message in self._generate_record_messages(record)
+            ]
+        for stream_name, output in outputs:
+            writer = self.batch_writers.get(stream_name)
+            if writer is None:
+                writer = self.batch_writers[stream_name] = BatchWriter(
+                    stream_name, self._tap.batch_config
+                )
+            batch_message = writer.write(output)
+            if batch_message is not None:
+                self._write_batch_message(batch_message)
+
+    def _write_batch_message(self, batch_message: dict) -> None:
+        """Emit a BATCH message, then any STATE message held back while the file was open."""
+        self._tap.record_writer.write_message(batch_message)
+        if self._state_deferred and not any(
+            writer.is_open for writer in self.batch_writers.values()
+        ):
+            self._state_deferred = False
+            super()._write_state_message()
+
+    def close_batches(self) -> None:
+        """Complete every open batch file."""
+        for writer in (self.batch_writers or {}).values():
+            batch_message = writer.close()
+            if batch_message is not None:
+                self._write_batch_message(batch_message)
+
+    def _write_schema_message(self) -> None:
+        self._tap.record_writer.flush()
+        super()._write_schema_message()
+
+    def _write_state_message(self) -> None:
+        """Write a STATE message once the records it covers have been written out.
+
+        While a batch file is open, the message is held back until the file's
+        BATCH message has been emitted.
+        """
+        if self.batch_writers and any(writer.is_open for writer in self.batch_writers.values()):
+            self._state_deferred = True
+            return
+        self._tap.record_writer.flush()
+        super()._write_state_message()
+
+    def _sync_records(self, context: Optional[dict] = None) -> None:
+        """Sync records, noting the shared session and cache counters beforehand.
+
+        The session and cache are shared by every stream, so the final metrics
+        report the difference from these counters.
+        """
+        self._connection_baseline = connection_stats(self.requests_session)
+        cache = self._tap.response_cache
+        self._cache_baseline = (cache.hits, cache.misses) if cache is not None else (0, 0)
+        super()._sync_records(context)
+
+    def _write_record_count_log(self, record_count: int, context: Optional[dict]) -> None:
+        """Log the record count, performance measurements and connection reuse."""
+        self.close_batches()
+        super()._write_record_count_log(record_count=record_count, context=context)
+        instrumentation = self._tap.instrumentation
+        instrumentation.add(self.name, None, "record_write_seconds", self._record_write_seconds)
+        self._record_write_seconds = 0.0
+        formatter = self.record_formatter
+        if formatter is not None and formatter.validator is not None:
+            instrumentation.add(self.name, None, "records_validated", formatter.validated)
+            instrumentation.add(self.name, None, "records_invalid", formatter.invalid)
+            formatter.validated = formatter.invalid = 0
+        self._write_instrumentation_log(instrumentation.stream_summary(self.name))
+        for stats in connection_stats_since(self.requests_session, self._connection_baseline):
+            for metric in ["connections_opened", "connections_reused"]:
+                self._write_metric_log(
+                    {
+                        "type": "counter",
+                        "metric": f"http_{metric}",
+                        "value": stats[metric],
+                        "tags": {"stream": self.name, "host": stats["host"]},
+                    },
+                    extra_tags=None,
+                )
+        cache = self._tap.response_cache
+        if cache is not None:
+            hits, misses = cache.hits - self._cache_baseline[0], cache.misses - self._cache_baseline[1]
+            for metric, value in [("hits", hits), ("misses", misses)]:
+                self._write_metric_log(
+                    {
+                        "type": "counter",
+                        "metric": f"response_cache_{metric}",
+                        "value": value,
+                        "tags": {"stream": self.name},
+                    },
+                    extra_tags=None,
                 )
-            ),
-            th.Property("scope", th.StringType),
-        ),
-        th.Property("to_date", th.NumberType),
-        th.Property("query", th.StringType),
-        th.Property("from_date", th.NumberType),
 
-    ).to_dict()
+    def _write_instrumentation_log(self, summary: dict) -> None:
+        """Log the stream's and each partition's histograms and totals as METRIC messages."""
+        for partition in [summary] + summary["partitions"]:
+            tags = {"stream": self.name}
+            if partition.get("context"):
+                tags["context"] = partition["context"]
+            for metric, value in partition["histograms"].items():
+                self._write_metric_log(
+                    {"type": "histogram", "metric": metric, "value": value, "tags": dict(tags)},
+                    extra_tags=None,
+                )
+            for metric, value in partition["totals"].items():
+                self._write_metric_log(
+                    {"type": "counter", "metric": metric, "value": value, "tags": dict(tags)},
+                    extra_tags=None,
+                )
 
-    #primary_keys = ["type_id"]
-    replication_key = "to_date"
-    schema_filepath = SCHEMAS_DIR / "metric_response_time.json"  # Optional: use schema_filepath with .json inside schemas/ 
-    
+    def validate_response(self, response: requests.Response) -> None:
+        """Treat 429 responses as retriable once the rate limit has reset."""
+        if response.status_code == 429:
+            reset = response.headers.get(RESET_HEADER)
+            bucket = getattr(response, "rate_limit_bucket", None) or self.rate_limit_bucket(None)
+            bucket.block(float(reset) if reset else 1.0)
+            raise RetriableAPIError(
+                f"429 Too Many Requests for path: {self.path}"
+            )
+        super().validate_response(response)
 
-    def _get_first_of_month_epoch(self, epoch):
-        date_time = datetime.fromtimestamp(epoch)  
-        date_split = str(date_time).split(' ') 
-        year, month, day = date_split[0].split('-')
 
-        first_day_of_month_date = datetime(int(year), int(month), 1, 0, 0, 0)
-        first_day_of_month_date_epoch  = calendar.timegm(first_day_of_month_date.timetuple())
+class DateWindowStream(TapDatadogStream):
+    """Base class for streams requested one date window at a time."""
 
-        return first_day_of_month_date_epoch
+    from_param = "from"
+    to_param = "to"
+    supports_month_to_date = False
+    supports_batch_messages = True
 
+    @property
+    def window_mode(self) -> str:
+        return self.config.get("window_mode", WINDOW_MODE_MONTH_TO_DATE)
+
+    @property
+    def parallel_windows(self) -> bool:
+        """Return True if a partition's windows are fetched concurrently (`parallel_backfill`)."""
+        return bool(self.config.get("parallel_backfill"))
+
+    def get_window_start(self, context: Optional[dict]) -> int:
+        """Return the epoch the next window starts from, using the bookmark if any."""
+        value = self.get_starting_replication_key_value(context)
+        if value is not None and not isinstance(value, str):
+            return to_epoch_seconds(value)
+
+        start = parse_start_date(self.config["start_date"])
+        if self.window_mode == WINDOW_MODE_MONTH_TO_DATE:
+            return first_of_month_epoch(start)
+        return start
+
+    def get_windows(self, context: Optional[dict]) -> Sequence[Window]:
+        """Return the windows still to be requested, up to the last closed day."""
+        month_to_date = self.supports_month_to_date and self.config.get(
+            "slo_month_to_date", False
+        )
+        return plan_windows(
+            self.window_mode,
+            self.get_window_start(context),
+            closed_days_end(),
+            self.config.get("window_days", 1),
+            month_to_date,
+        )
 
     def get_url_params(self, context: Optional[dict], next_page_token: Optional[Any]) -> Dict[str, Any]:
         """Return a dictionary of values to be used in URL parameterization."""
+        window: Window = next_page_token
         params: dict = {}
-        params["query"] = 'trace.aspnet.request.duration{env:production}'
-        try:
-            if self.replication_key_value == 0:
-                self.replication_key_value = self.stream_state["replication_key_value"]
-                self.get_next_page_token_epoch = self.replication_key_value + 86400
-            else:
-                self.get_next_page_token_epoch = self.get_next_page_token_epoch + 86400
-            
-            first_of_month_epoch = self._get_first_of_month_epoch(self.get_next_page_token_epoch)
-            
-
-            params["from"] = first_of_month_epoch
-            params["to"] = self.get_next_page_token_epoch
-
-            if self.get_next_page_token_epoch + 86400 >= int(time.time()):
-                self.slo_date_overreach = True
-            
-
-        except:
-            if "to_date" not in self.stream_state:
-                if self.first_run:
-
-                    # Get Start date for initial full sync
-                    year, month, day = self.configuration_start_date.split('-')
+        params[self.from_param] = window.start
+        params[self.to_param] = window.end
+        return params
 
-                    first_of_month_date = datetime(int(year), int(month), 1, 0, 0, 0)
-                    first_of_month_epoch = calendar.timegm(first_of_month_date.timetuple())
+    def get_cache_until(self, context: Optional[dict], next_page_token: Optional[Any]) -> Optional[int]:
+        """Return the end of the requested window."""
+        window: Window = next_page_token
+        return window.end
+
+    def request_window(self, context: Optional[dict], window: Window) -> Iterable[dict]:
+        """Request every page of a single window, tagging rows with the window kind.
+
+        Pages after the first are requested with the window's `cursor` set to the
+        value returned by `get_next_page_token`.
+        """
+        decorated_request = self.request_decorator(self._request)
+        token: Optional[Window] = window
+        while token:
+            prepared_request = self.prepare_request(context, next_page_token=token)
+            resp = decorated_request(prepared_request, context)
+            for row in self.parse_measured(resp, context):
+                row["window_type"] = window.kind
+                yield row
+            cursor = self.get_next_page_token(response=resp, previous_token=token)
+            if cursor and cursor == token.cursor:
+                raise RuntimeError(
+                    f"Loop detected in pagination. Cursor {cursor} is identical to prior cursor."
+                )
+            token = window._replace(cursor=cursor) if cursor else None
+
+    def checkpoint_value(self, window: Window) -> Any:
+        """Return the bookmark recorded once every window ending with `window` is done."""
+        return window.end
+
+    def _increment_stream_state(self, latest_record: Dict[str, Any], *, context: Optional[dict] = None) -> None:
+        """Leave bookmarks alone: they only move when a window completes, see `checkpoint`."""
+
+    def request_records(self, context: Optional[dict]) -> Iterable[Any]:
+        """Request each window once, in order, with a `Checkpoint` after each completed one.
+
+        A resumed sync starts after the last checkpoint, so an interruption loses
+        at most the window in progress. With `parallel_backfill`, windows are
+        fetched concurrently as independent slices and replayed in window order,
+        so bookmarks still only move forward.
+        """
+        windows = self.get_windows(context)
+        if not self.parallel_windows or self.max_workers < 2 or len(windows) < 2:
+            rows = (self.request_window(context, window) for window in windows)
+        else:
+            prefetcher = OrderedPrefetcher(
+                lambda window: self.request_window(context, window), self.max_workers
+            )
+            prefetcher.start(windows)
+            rows = (prefetcher.results(window) for window in windows)
+
+        for index, window_rows in enumerate(rows):
+            yield from window_rows
+            window = windows[index]
+            # Windows sharing an end (a month-to-date window after its last day)
+            # complete together, so resuming never skips the later one.
+            if index + 1 == len(windows) or windows[index + 1].end != window.end:
+                yield Checkpoint(self.checkpoint_value(window))
+
+
+DEFAULT_AGGREGATE_LOGS_HOSTS = [
+    "api.degreed.com",
+    "api.eu.degreed.com",
+    "api.ca.degreed.com"
+]
+
+
+# The request log query of `aggregate_logs`, completed with each partition's host.
+AGGREGATE_LOGS_QUERY = (
+    'source:degreed.api @MessageTemplate:"HTTP {RequestMethod} {RequestPath} responded '
+    '{StatusCode} in {Elapsed:0.0000} ms" host: '
+)
+AGGREGATE_LOGS_GROUP_BY = [
+    "@http.status_code",
+    "@Properties.OrganizationId",
+    "@Properties.PathTemplate",
+    "@Properties.RequestMethod",
+]
+AGGREGATE_LOGS_COMPUTES = [
+    {"aggregation": "count", "type": "total"},
+    {"aggregation": "sum", "type": "total", "metric": "@Properties.Elapsed"},
+]
+
+
+class LogsAggregateStream(DateWindowStream):
+    """Base class for streams of `/api/v2/logs/analytics/aggregate` buckets.
+
+    Windows are closed UTC days or hours, bookmarked by `window_end`.
+    """
 
-                    self.get_next_page_token_epoch = first_of_month_epoch + 86400
+    path = "/api/v2/logs/analytics/aggregate" # API endpoint after base_url 
+    rest_method = "POST"
 
-                    params["from"] = first_of_month_epoch
-                    params["to"] = self.get_next_page_token_epoch
+    records_jsonpath = "$.data.buckets.[*]" # https://jsonpath.com Use requests response json to identify the json path 
+    next_page_token_jsonpath = "$.meta.page.after" # cursor returned when more buckets are available
+    streaming_records_prefix = "data.buckets.item"
+    streaming_capture = ["meta.page.after"]
+    replication_key = "window_end"
 
-                    self.first_run = False
-                    
-                else: 
-                    first_of_month_epoch = self._get_first_of_month_epoch(self.get_next_page_token_epoch)
-                    self.get_next_page_token_epoch = self.get_next_page_token_epoch + 86400
+    @property
+    def window_mode(self) -> str:
+        return self.config.get("aggregate_logs_window", WINDOW_MODE_DAILY)
+
+    def get_partition_window_mode(self, context: Optional[dict]) -> str:
+        """Return the window size of a partition, the stream's by default."""
+        return self.window_mode
+
+    def get_window_start(self, context: Optional[dict]) -> int:
+        """Return the partition's bookmark, else `aggregate_logs_start_date`, else yesterday."""
+        value = self.get_starting_replication_key_value(context)
+        if value is not None and not isinstance(value, str):
+            return to_epoch_seconds(value)
+        if self.config.get("aggregate_logs_start_date"):
+            return parse_start_date(self.config["aggregate_logs_start_date"])
+        return closed_days_end() - SECONDS_PER_DAY
+
+    def get_windows(self, context: Optional[dict]) -> Sequence[Window]:
+        """Return every closed window since the partition's bookmark."""
+        window_mode = self.get_partition_window_mode(context)
+        if window_mode == WINDOW_MODE_HOURLY:
+            end = closed_hours_end()
+        else:
+            end = closed_days_end()
+        return plan_windows(window_mode, self.get_window_start(context), end)
 
-                    params["from"] = first_of_month_epoch
-                    params["to"] = self.get_next_page_token_epoch
+    def get_url_params(self, context: Optional[dict], next_page_token: Optional[Any]) -> Dict[str, Any]:
+        """The window is sent in the request payload."""
+        return {}
 
-                    if self.get_next_page_token_epoch + 86400 >= int(time.time()):
-                        self.slo_date_overreach = True
-        return params
+    def request_window(self, context: Optional[dict], window: Window) -> Iterable[dict]:
+        """Request a single window, adding its bounds to every bucket."""
+        for row in super().request_window(context, window):
+            row["window_start"] = window.start
+            row["window_end"] = window.end
+            yield row
 
     def get_next_page_token(
         self, response: requests.Response, previous_token: Optional[Any]
     ) -> Optional[Any]:
-        """Return a token for identifying next page or None if no more pages."""
+        """Return the bucket cursor, read while streaming when the body was streamed."""
+        if self.stream_response:
+            return response.streamed_values.get("meta.page.after")
+        return super().get_next_page_token(response, previous_token)
 
-        if self.get_next_page_token_epoch + 86400 >= int(time.time()):
-            return None
-        else: 
-            return self.get_next_page_token_epoch
- 
 
-############################################################################
-class SLO_History_US_Prod(TapDatadogStream):        
+class AggregateLogs(LogsAggregateStream):
+    """Aggregated API request logs, one partition and bookmark per host."""
 
     def __init__(self, tap: Tap):
         super().__init__(tap)
-        self.logger = logging.getLogger(__name__)
-
-        self.slo_id = 'e96fa5aa00dc57af8718c8e7044b0f51' # prod-us
-
-        self.configuration_start_date = self.config["start_date"]
-        self.get_next_page_token_epoch = 0
-        self.end_of_month_limit_epoch = 0
-        self.replication_key_value = 0
-        self.first_run = True
-        self.slo_date_overreach = False
-        
-    name = "slo_history_us_prod" # Stream name 
-    rest_method = "GET"
-    slo_id = 'e96fa5aa00dc57af8718c8e7044b0f51' # prod-us
-    path = f"/api/v1/slo/{slo_id}/history"
-    records_jsonpath = "$.data" # https://jsonpath.com Use requests response json to identify the json path 
-    next_page_token = 0
+        self.host = self.config.get("aggregate_logs_hosts") or DEFAULT_AGGREGATE_LOGS_HOSTS
 
-    #primary_keys = ["type_id"]
-    replication_key = "to_ts"
-    schema_filepath = SCHEMAS_DIR / "slo_history_us_prod.json"  # Optional: use schema_filepath with .json inside schemas/ 
-    
-    def _get_first_of_month_epoch(self, epoch):
-        date_time = datetime.fromtimestamp(epoch)  
-        date_split = str(date_time).split(' ') 
-        year, month, day = date_split[0].split('-')
+    name = "aggregate_logs" # Stream name 
+    #primary_keys = ["id"]
 
-        first_day_of_month_date = datetime(int(year), int(month), 1, 0, 0, 0)
-        first_day_of_month_date_epoch  = calendar.timegm(first_day_of_month_date.timetuple())
+    schema_filepath = SCHEMAS_DIR / "aggregate_logs.json"  # Optional: use schema_filepath with .json inside schemas/ 
 
-        return first_day_of_month_date_epoch
+    def site_partitions(self, site: Site) -> Optional[List[dict]]:
+        """One partition per host, queried concurrently."""
+        hosts = site.options.get("aggregate_logs_hosts") or self.host
+        return [{"host_name": host} for host in hosts]
 
-    def get_url_params(self, context: Optional[dict], next_page_token: Optional[Any]) -> Dict[str, Any]:
-        """Return a dictionary of values to be used in URL parameterization."""
-        params: dict = {}
-        try:
-            if self.replication_key_value == 0:
-                self.replication_key_value = self.stream_state["replication_key_value"]
-                self.get_next_page_token_epoch = self.replication_key_value + 86400
-            else:
-                self.get_next_page_token_epoch = self.get_next_page_token_epoch + 86400
-            
-            first_of_month_epoch = self._get_first_of_month_epoch(self.get_next_page_token_epoch)
-
-            params["from_ts"] = first_of_month_epoch
-            params["to_ts"] = self.get_next_page_token_epoch
-
-            if self.get_next_page_token_epoch + 86400 >= int(time.time()):
-                self.slo_date_overreach = True
-        except:
-            if "to_ts" not in self.stream_state:
-                if self.first_run:
-                    # Get Start date for initial full sync
-                    year, month, day = self.configuration_start_date.split('-')
-
-                    first_of_month_date = datetime(int(year), int(month), 1, 0, 0, 0)
-                    first_of_month_epoch = calendar.timegm(first_of_month_date.timetuple())
-
-                    self.get_next_page_token_epoch = first_of_month_epoch + 86400
-
-                    params["from_ts"] = first_of_month_epoch
-                    params["to_ts"] = self.get_next_page_token_epoch
-                    self.first_run = False
-                else: 
-                    first_of_month_epoch = self._get_first_of_month_epoch(self.get_next_page_token_epoch)
-                    self.get_next_page_token_epoch = self.get_next_page_token_epoch + 86400
-
-                    params["from_ts"] = first_of_month_epoch
-                    params["to_ts"] = self.get_next_page_token_epoch
-
-                    if self.get_next_page_token_epoch + 86400 >= int(time.time()):
-                        self.slo_date_overreach = True
-        return params
+    def prepare_request_payload(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> Optional[dict]:
+        """Define request parameters to return"""
+        window: Window = next_page_token
+        facet_limit = self.config.get("aggregate_logs_facet_limit")
+        group_by = [
+            {"facet": facet, "limit": facet_limit} if facet_limit else {"facet": facet}
+            for facet in AGGREGATE_LOGS_GROUP_BY
+        ]
+        return aggregate_payload(
+            AGGREGATE_LOGS_QUERY + context["host_name"],
+            DEFAULT_INDEXES,
+            group_by,
+            AGGREGATE_LOGS_COMPUTES,
+            window.start,
+            window.end,
+            window.cursor,
+        )
 
     def post_process(self, row: dict, context: Optional[dict]) -> dict:
-        row["slo_id"] = self.slo_id            
+        row["host_name"] = context["host_name"]
         return row
 
-    def get_next_page_token(
-        self, response: requests.Response, previous_token: Optional[Any]
-    ) -> Optional[Any]:
-        """Return a token for identifying next page or None if no more pages."""
-
-        if self.get_next_page_token_epoch + 86400 >= int(time.time()):
-            return None
-        else: 
-            return self.get_next_page_token_epoch
- 
-class SLO_History_EU_Prod(TapDatadogStream):        
- 
-    def __init__(self, tap: Tap):
-        super().__init__(tap)
-        self.logger = logging.getLogger(__name__)
-        self.slo_id = '12b1e51cb1bd57928ce126502a9a7e01' # prod-us
-        self.configuration_start_date = self.config["start_date"]
-        self.get_next_page_token_epoch = 0
-        self.end_of_month_limit_epoch = 0
-        self.replication_key_value = 0
-        self.first_run = True
-        self.slo_date_overreach = False
-        
-    name = "slo_history_eu_prod" # Stream name 
-    rest_method = "GET"
-    slo_id = '12b1e51cb1bd57928ce126502a9a7e01' # prod-us
-    path = f"/api/v1/slo/{slo_id}/history"
-    records_jsonpath = "$.data" # https://jsonpath.com Use requests response json to identify the json path 
-    next_page_token = 0
-
-    replication_key = "to_ts"
-    schema_filepath = SCHEMAS_DIR / "slo_history_eu_prod.json"  # Optional: use schema_filepath with .json inside schemas/ 
-    
-    def _get_first_of_month_epoch(self, epoch):
 
-        date_time = datetime.fromtimestamp(epoch)  
-        date_split = str(date_time).split(' ') 
-        year, month, day = date_split[0].split('-')
+class LogsAggregate(LogsAggregateStream):
+    """Named aggregate queries from `aggregate_queries`, one record per query and bucket.
 
-        first_day_of_month_date = datetime(int(year), int(month), 1, 0, 0, 0)
-        first_day_of_month_date_epoch  = calendar.timegm(first_day_of_month_date.timetuple())
+    Queries that can share a request form one partition, and partitions are
+    queried concurrently; see `tap_datadog.aggregates`. Bookmarks are kept per
+    partition but read per query, so regrouping queries never resyncs or skips
+    a window of any of them.
+    """
 
-        return first_day_of_month_date_epoch
+    name = "logs_aggregate"
+    schema_filepath = SCHEMAS_DIR / "logs_aggregate.json"
 
-    def get_url_params(self, context: Optional[dict], next_page_token: Optional[Any]) -> Dict[str, Any]:
-        """Return a dictionary of values to be used in URL parameterization."""
-        params: dict = {}
-        try:
-            if self.replication_key_value == 0:
-                self.replication_key_value = self.stream_state["replication_key_value"]
-                self.get_next_page_token_epoch = self.replication_key_value + 86400
-            else:
-                self.get_next_page_token_epoch = self.get_next_page_token_epoch + 86400
-            
-            first_of_month_epoch = self._get_first_of_month_epoch(self.get_next_page_token_epoch)
+    @cached_property
+    def aggregate_groups(self) -> List[AggregateGroup]:
+        """Return the configured queries, grouped into as few requests as possible."""
+        queries = [
+            AggregateQuery.from_config(entry, self.window_mode)
+            for entry in self.config.get("aggregate_queries") or []
+        ]
+        return group_queries(queries)
+
+    def site_partitions(self, site: Site) -> Optional[List[dict]]:
+        """One partition per group of queries sharing a request."""
+        return [{"queries": group.name} for group in self.aggregate_groups]
+
+    def group_for(self, context: Optional[dict]) -> AggregateGroup:
+        """Return the group of queries a partition requests."""
+        name = (context or {}).get("queries")
+        return next(group for group in self.aggregate_groups if group.name == name)
+
+    def get_partition_window_mode(self, context: Optional[dict]) -> str:
+        return self.group_for(context).window
+
+    def query_bookmarks(self, context: Optional[dict]) -> Dict[str, int]:
+        """Return the bookmark of each of a partition's queries, under any grouping.
+
+        A query's bookmark is the latest of every partition of the same site
+        that requested it, including partitions of earlier groupings.
+        """
+        names = {query.name for query in self.group_for(context).queries}
+        site = (context or {}).get("site")
+        bookmarks: Dict[str, int] = {}
+        for partition in list(self.stream_state.get("partitions") or []):
+            partition_context = partition.get("context") or {}
+            value = partition.get("replication_key_value")
+            if partition_context.get("site") != site or value is None or isinstance(value, str):
+                continue
+            for name in (partition_context.get("queries") or "").split(","):
+                if name in names:
+                    bookmarks[name] = max(bookmarks.get(name, 0), to_epoch_seconds(value))
+        return bookmarks
+
+    def get_window_start(self, context: Optional[dict]) -> int:
+        """Return the earliest bookmark of the partition's queries.
+
+        Queries without any bookmark start from `aggregate_logs_start_date`.
+        """
+        starts = list(self.query_bookmarks(context).values())
+        if len(starts) < len(self.group_for(context).queries):
+            starts.append(super().get_window_start(context))
+        return min(starts)
+
+    def request_records(self, context: Optional[dict]) -> Iterable[Any]:
+        """Without `aggregate_queries`, the stream has nothing to request."""
+        if not self.aggregate_groups:
+            return []
+        return super().request_records(context)
 
-            params["from_ts"] = first_of_month_epoch
-            params["to_ts"] = self.get_next_page_token_epoch
+    def prepare_request_payload(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> Optional[dict]:
+        """Send the group's shared filter and group-by with every query's computes."""
+        window: Window = next_page_token
+        return self.group_for(context).payload(window.start, window.end, window.cursor)
+
+    def request_window(self, context: Optional[dict], window: Window) -> Iterable[dict]:
+        """Split each bucket of a window into one record per query.
+
+        Queries whose bookmark is already past the window get no records.
+        """
+        group = self.group_for(context)
+        bookmarks = self.query_bookmarks(context)
+        for bucket in super().request_window(context, window):
+            for record in group.split(bucket):
+                if bookmarks.get(record["query_name"], window.start) >= window.end:
+                    continue
+                record["window_start"] = bucket["window_start"]
+                record["window_end"] = bucket["window_end"]
+                record["window_type"] = bucket["window_type"]
+                yield record
+
+
+DEFAULT_LOG_EVENTS_SLICE_MINUTES = 15
+DEFAULT_LOG_EVENTS_PAGE_SIZE = 1000
+MAX_LOG_EVENTS_PAGE_SIZE = 5000
+
+
+class LogEvents(DateWindowStream):
+    """Raw log events from the Logs Search API, one partition per query and host.
+
+    A partition's range is split into slices of `log_events_slice_minutes`.
+    Slices are fetched concurrently, a page of `log_events_page_size` events
+    at a time, and replayed in order with a checkpoint after each one. At most
+    `max_workers` slices are fetched ahead of the one being written, each
+    holding a bounded queue of events, so memory does not grow with the
+    number of slices or events.
+    """
+
+    name = "log_events"
+    path = "/api/v2/logs/events/search"
+    rest_method = "POST"
+    primary_keys = ["id"]
 
-            if self.get_next_page_token_epoch + 86400 >= int(time.time()):
-                self.slo_date_overreach = True
+    records_jsonpath = "$.data[*]"
+    next_page_token_jsonpath = "$.meta.page.after"
+    streaming_records_prefix = "data.item"
+    streaming_capture = ["meta.page.after"]
+    replication_key = "window_end"
+    schema_filepath = SCHEMAS_DIR / "log_events.json"
 
-        except:
-            if "to_ts" not in self.stream_state:
-                if self.first_run:
-                    # Get Start date for initial full sync
-                    year, month, day = self.configuration_start_date.split('-')
+    @property
+    def parallel_windows(self) -> bool:
+        """Slices are always fetched concurrently, up to `max_workers`."""
+        return True
+
+    @cached_property
+    def queries(self) -> Dict[str, dict]:
+        """Return the `log_events_queries` by name."""
+        queries = self.config.get("log_events_queries") or []
+        names = [query["name"] for query in queries]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Log event query names must be unique: {names}")
+        return {query["name"]: query for query in queries}
+
+    def site_partitions(self, site: Site) -> Optional[List[dict]]:
+        """One partition per query, and per host of `log_events_hosts` if set."""
+        hosts = site.setting(self.config, "log_events_hosts") or []
+        if not hosts:
+            return [{"query_name": name} for name in self.queries]
+        return [
+            {"query_name": name, "host_name": host} for name in self.queries for host in hosts
+        ]
 
-                    first_of_month_date = datetime(int(year), int(month), 1, 0, 0, 0)
-                    first_of_month_epoch = calendar.timegm(first_of_month_date.timetuple())
+    def get_window_start(self, context: Optional[dict]) -> int:
+        """Return the partition's bookmark, else `log_events_start_date`, else yesterday."""
+        value = self.get_starting_replication_key_value(context)
+        if value is not None and not isinstance(value, str):
+            return to_epoch_seconds(value)
+        if self.config.get("log_events_start_date"):
+            return parse_start_date(self.config["log_events_start_date"])
+        return closed_days_end() - SECONDS_PER_DAY
+
+    def get_windows(self, context: Optional[dict]) -> Sequence[Window]:
+        """Return the slices of every closed hour since the partition's bookmark."""
+        minutes = self.config.get("log_events_slice_minutes", DEFAULT_LOG_EVENTS_SLICE_MINUTES)
+        return slice_windows(self.get_window_start(context), closed_hours_end(), minutes * 60)
+
+    def request_records(self, context: Optional[dict]) -> Iterable[Any]:
+        """Without `log_events_queries`, the stream has nothing to request."""
+        if not self.queries:
+            return []
+        return super().request_records(context)
 
-                    self.get_next_page_token_epoch = first_of_month_epoch + 86400
+    def get_url_params(self, context: Optional[dict], next_page_token: Optional[Any]) -> Dict[str, Any]:
+        """The slice and cursor are sent in the request payload."""
+        return {}
 
-                    params["from_ts"] = first_of_month_epoch
-                    params["to_ts"] = self.get_next_page_token_epoch
-                    
-                    self.first_run = False
-                    
-                else: 
-                    first_of_month_epoch = self._get_first_of_month_epoch(self.get_next_page_token_epoch)
-                    self.get_next_page_token_epoch = self.get_next_page_token_epoch + 86400
+    def prepare_request_payload(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> Optional[dict]:
+        """Search the partition's query and host over one slice, oldest events first."""
+        window: Window = next_page_token
+        query = self.queries[context["query_name"]]
+        search = query.get("query") or "*"
+        if context.get("host_name"):
+            search = f"{search} host:{context['host_name']}"
+        page_size = self.config.get("log_events_page_size", DEFAULT_LOG_EVENTS_PAGE_SIZE)
+        payload = {
+            "filter": {
+                "query": search,
+                "indexes": query.get("indexes") or DEFAULT_INDEXES,
+                "from": datetime.fromtimestamp(window.start, tz=timezone.utc).isoformat(),
+                "to": datetime.fromtimestamp(window.end, tz=timezone.utc).isoformat(),
+            },
+            "sort": "timestamp",
+            "page": {"limit": min(page_size, MAX_LOG_EVENTS_PAGE_SIZE)},
+        }
+        if window.cursor:
+            payload["page"]["cursor"] = window.cursor
+        return payload
 
-                    params["from_ts"] = first_of_month_epoch
-                    params["to_ts"] = self.get_next_page_token_epoch
+    def request_window(self, context: Optional[dict], window: Window) -> Iterable[dict]:
+        """Request every page of a slice, adding its bounds to every event."""
+        for row in super().request_window(context, window):
+            row["window_start"] = window.start
+            row["window_end"] = window.end
+            yield row
 
-                    if self.get_next_page_token_epoch + 86400 >= int(time.time()):
-                        self.slo_date_overreach = True
-        return params
+    def get_next_page_token(
+        self, response: requests.Response, previous_token: Optional[Any]
+    ) -> Optional[Any]:
+        """Return the event cursor, read while streaming when the body was streamed."""
+        if self.stream_response:
+            return response.streamed_values.get("meta.page.after")
+        return super().get_next_page_token(response, previous_token)
 
     def post_process(self, row: dict, context: Optional[dict]) -> dict:
-        row["slo_id"] = self.slo_id
+        """Flatten an event's attributes (timestamp, host, message, ...) into the record."""
+        row.pop("type", None)
+        row.update(row.pop("attributes", None) or {})
+        row["query_name"] = context["query_name"]
+        if context.get("host_name"):
+            row["host_name"] = context["host_name"]
         return row
 
-    def get_next_page_token(
-        self, response: requests.Response, previous_token: Optional[Any]
-    ) -> Optional[Any]:
-        """Return a token for identifying next page or None if no more pages."""
 
-        if self.get_next_page_token_epoch + 86400 >= int(time.time()):
-            return None
-        else: 
-            return self.get_next_page_token_epoch
- 
-class SLO_History_CA_Prod(TapDatadogStream):        
- 
-    def __init__(self, tap: Tap):
-        super().__init__(tap)
-        self.logger = logging.getLogger(__name__)
-        self.slo_id = '36ecf33bedb25fedb64d9ef843780c8b' # prod-us
-        self.configuration_start_date = self.config["start_date"]
-        self.get_next_page_token_epoch = 0
-        self.end_of_month_limit_epoch = 0
-        self.replication_key_value = 0
-        self.first_run = True
-        self.slo_date_overreach = False
-        
-    name = "slo_history_ca_prod" # Stream name 
-    rest_method = "GET"
-    slo_id = '36ecf33bedb25fedb64d9ef843780c8b' # prod-us
-    path = f"/api/v1/slo/{slo_id}/history"
-    records_jsonpath = "$.data" # https://jsonpath.com Use requests response json to identify the json path 
-    next_page_token = 0
+class Metric_Response_Time(DateWindowStream):        
 
-    replication_key = "to_ts"
-    schema_filepath = SCHEMAS_DIR / "slo_history_ca_prod.json"  # Optional: use schema_filepath with .json inside schemas/ 
+    name = "metric_response_time" # Stream name 
     
-    def _get_first_of_month_epoch(self, epoch):
-        date_time = datetime.fromtimestamp(epoch)  
-        date_split = str(date_time).split(' ') 
-        year, month, day = date_split[0].split('-')
+    #records_jsonpath = "$." 
 
-        first_day_of_month_date = datetime(int(year), int(month), 1, 0, 0, 0)
-        first_day_of_month_date_epoch  = calendar.timegm(first_day_of_month_date.timetuple())
+    #primary_keys = ["type_id"]
+    replication_key = "to_date"
+    schema_filepath = SCHEMAS_DIR / "metric_response_time.json"  # Optional: use schema_filepath with .json inside schemas/ 
+
+    streaming_records_prefix = "series.item"
+    streaming_capture = ["resp_version", "query", "from_date", "to_date"]
+
+    @property
+    def uses_timeseries_api(self) -> bool:
+        """Return True if queries go to the v2 timeseries endpoint (`metric_api: v2`)."""
+        return self.config.get("metric_api") == "v2"
 
-        return first_day_of_month_date_epoch
+    @property
+    def path(self) -> str:
+        return TIMESERIES_PATH if self.uses_timeseries_api else "/api/v1/query"
+
+    @property
+    def rest_method(self) -> str:
+        return "POST" if self.uses_timeseries_api else "GET"
+
+    @property
+    def stream_response(self) -> bool:
+        """Timeseries responses are already columnar and are always read whole."""
+        return not self.uses_timeseries_api and super().stream_response
+
+    @cached_property
+    def query_batches(self) -> List[List[str]]:
+        """The configured queries, with group-by and rollup applied, in as few batches as possible."""
+        queries = [
+            build_metric_query(
+                query,
+                group_by=self.config.get("metric_group_by"),
+                rollup_function=self.config.get("metric_rollup_function"),
+                rollup_interval=self.config.get("metric_rollup_interval"),
+            )
+            for query in self.config.get("metric_queries") or DEFAULT_METRIC_QUERIES
+        ]
+        if self.uses_timeseries_api:
+            queries = [with_aggregator(query) for query in queries]
+            return batch_queries(queries, max_count=TIMESERIES_BATCH_SIZE)
+        return batch_queries(queries)
 
     def get_url_params(self, context: Optional[dict], next_page_token: Optional[Any]) -> Dict[str, Any]:
         """Return a dictionary of values to be used in URL parameterization."""
-        params: dict = {}
-        try:
-            if self.replication_key_value == 0:
-                self.replication_key_value = self.stream_state["replication_key_value"]
-                self.get_next_page_token_epoch = self.replication_key_value + 86400
-            else:
-                self.get_next_page_token_epoch = self.get_next_page_token_epoch + 86400
-            
-            first_of_month_epoch = self._get_first_of_month_epoch(self.get_next_page_token_epoch)
-            
-
-            params["from_ts"] = first_of_month_epoch
-            params["to_ts"] = self.get_next_page_token_epoch
-
-            if self.get_next_page_token_epoch + 86400 >= int(time.time()):
-                self.slo_date_overreach = True
-        except:
-            if "to_ts" not in self.stream_state:
-                if self.first_run:
-                    # Get Start date for initial full sync
-                    year, month, day = self.configuration_start_date.split('-')
-
-                    first_of_month_date = datetime(int(year), int(month), 1, 0, 0, 0)
-                    first_of_month_epoch = calendar.timegm(first_of_month_date.timetuple())
-
-                    self.get_next_page_token_epoch = first_of_month_epoch + 86400
-
-                    params["from_ts"] = first_of_month_epoch
-                    params["to_ts"] = self.get_next_page_token_epoch
-     
-                    self.first_run = False
-                    
-                else: 
-                    first_of_month_epoch = self._get_first_of_month_epoch(self.get_next_page_token_epoch)
-                    self.get_next_page_token_epoch = self.get_next_page_token_epoch + 86400
-
-                    params["from_ts"] = first_of_month_epoch
-                    params["to_ts"] = self.get_next_page_token_epoch
-
-                    if self.get_next_page_token_epoch + 86400 >= int(time.time()):
-                        self.slo_date_overreach = True
+        if self.uses_timeseries_api:
+            return {}
+        params = super().get_url_params(context, next_page_token)
+        params["query"] = ",".join((context or {}).get("queries") or self.query_batches[0])
         return params
 
-    def post_process(self, row: dict, context: Optional[dict]) -> dict:
-        row["slo_id"] = self.slo_id     
-        return row
+    def prepare_request_payload(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> Optional[dict]:
+        """Send the window and the batch's queries in the body of timeseries requests."""
+        if not self.uses_timeseries_api:
+            return None
+        window: Window = next_page_token
+        queries = (context or {}).get("queries") or self.query_batches[0]
+        return timeseries_payload(queries, window.start * 1000, window.end * 1000)
+
+    def parse_response(self, response: requests.Response) -> Iterable[dict]:
+        """Yield the response in the configured `metric_output` format."""
+        output = self.config.get("metric_output", METRIC_OUTPUT_NESTED)
+        for record in self._parse_series_records(response):
+            yield from format_metric_record(record, output)
+
+    def _parse_series_records(self, response: requests.Response) -> Iterable[dict]:
+        """Yield the whole response, or one record per series when streaming."""
+        if self.uses_timeseries_api:
+            body = response.json()
+            if body.get("errors"):
+                self.logger.warning("Timeseries query errors: %s", body["errors"])
+            yield timeseries_record(body, json.loads(response.request.body))
+            return
+
+        if not self.stream_response:
+            yield from super().parse_response(response)
+            return
+
+        series_count = 0
+        for series in super().parse_response(response):
+            series_count += 1
+            yield {**response.streamed_values, "series": [series]}
+        if not series_count:
+            yield {**response.streamed_values, "series": []}
+
+    def checkpoint_value(self, window: Window) -> Any:
+        """`to_date` bookmarks are in milliseconds."""
+        return window.end * 1000
+
+    def request_window(self, context: Optional[dict], window: Window) -> Iterable[dict]:
+        """Request every query batch for a window, filling its bounds if they were not streamed yet."""
+        for queries in self.query_batches:
+            for row in super().request_window({**(context or {}), "queries": queries}, window):
+                row.setdefault("from_date", window.start * 1000)
+                row.setdefault("to_date", window.end * 1000)
+                yield row
 
-    def get_next_page_token(
-        self, response: requests.Response, previous_token: Optional[Any]
-    ) -> Optional[Any]:
-        """Return a token for identifying next page or None if no more pages."""
 
-        if self.get_next_page_token_epoch + 86400 >= int(time.time()):
-            return None
-        else: 
-            return self.get_next_page_token_epoch
+############################################################################
+DEFAULT_SLO_IDS = [
+    "e96fa5aa00dc57af8718c8e7044b0f51", # prod-us
+    "12b1e51cb1bd57928ce126502a9a7e01", # prod-eu
+    "36ecf33bedb25fedb64d9ef843780c8b", # prod-ca
+]
+SLO_PAGE_SIZE = 1000
+# The per-SLO streams slo_history replaced, whose bookmarks seed its partitions.
+LEGACY_SLO_STREAMS = {
+    "e96fa5aa00dc57af8718c8e7044b0f51": "slo_history_us_prod",
+    "12b1e51cb1bd57928ce126502a9a7e01": "slo_history_eu_prod",
+    "36ecf33bedb25fedb64d9ef843780c8b": "slo_history_ca_prod",
+}
+
+
+class SLO_History(DateWindowStream):
+    """History of every configured SLO, one partition per SLO."""
+
+    name = "slo_history" # Stream name 
+    rest_method = "GET"
+    path = "/api/v1/slo/{slo_id}/history"
+    records_jsonpath = "$.data" # https://jsonpath.com Use requests response json to identify the json path 
+    from_param = "from_ts"
+    to_param = "to_ts"
+    supports_month_to_date = True
+
+    #primary_keys = ["type_id"]
+    replication_key = "to_ts"
+    schema_filepath = SCHEMAS_DIR / "slo_history.json"  # Optional: use schema_filepath with .json inside schemas/ 
+
+    def site_partitions(self, site: Site) -> Optional[List[dict]]:
+        """One partition per SLO, from `slo_ids` or discovered via `/api/v1/slo`."""
+        if site.setting(self.config, "slo_discovery"):
+            slo_ids = self.discover_slo_ids(site)
+        else:
+            slo_ids = site.setting(self.config, "slo_ids") or DEFAULT_SLO_IDS
+        return [{"slo_id": slo_id} for slo_id in slo_ids]
+
+    def discover_slo_ids(self, site: Site) -> List[str]:
+        """Return the IDs of a site's SLOs matching the optional `slo_tags_query`."""
+        slo_ids: List[str] = []
+        params: dict = {"limit": SLO_PAGE_SIZE, "offset": 0}
+        tags_query = site.setting(self.config, "slo_tags_query")
+        if tags_query:
+            params["tags_query"] = tags_query
+        headers = {**self.http_headers, **site.auth_headers}
+        while True:
+            response = self.requests_session.get(
+                f"{site.url}/api/v1/slo",
+                params=params,
+                headers=headers,
+                timeout=self.timeout,
+            )
+            self.validate_response(response)
+            page = response.json().get("data") or []
+            slo_ids.extend(slo["id"] for slo in page)
+            if len(page) < SLO_PAGE_SIZE:
+                self.logger.info(f"Discovered {len(slo_ids)} SLOs on {site.name}.")
+                return slo_ids
+            params["offset"] += SLO_PAGE_SIZE
+
+    def get_window_start(self, context: Optional[dict]) -> int:
+        """Return the partition's bookmark, else that of the SLO's former stream, if any.
+
+        The prod US, EU and CA SLOs used to be synced by streams of their own, so
+        their first `slo_history` sync carries on from those streams' bookmarks.
+        """
+        value = self.get_starting_replication_key_value(context)
+        if (value is None or isinstance(value, str)) and not self._tap.multi_site:
+            legacy_stream = LEGACY_SLO_STREAMS.get((context or {}).get("slo_id"))
+            legacy_state = self.tap_state.get("bookmarks", {}).get(legacy_stream) or {}
+            value = legacy_state.get("replication_key_value")
+            if value is not None and not isinstance(value, str):
+                return to_epoch_seconds(value)
+        return super().get_window_start(context)
+
+    def post_process(self, row: dict, context: Optional[dict]) -> dict:
+        row["slo_id"] = context["slo_id"]
+        return row
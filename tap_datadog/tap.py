@@ -1,29 +1,41 @@
 """datadog tap class."""
 
-from pathlib import Path
-from typing import List
-import logging
-import click
+import atexit
+from functools import cached_property
+from typing import List, Optional
+import requests
 from singer_sdk import Tap, Stream
 from singer_sdk import typing as th
+from singer_sdk.helpers._singer import Catalog
 
 
+from tap_datadog.batches import DEFAULT_BATCH_SIZE, BatchConfig
+from tap_datadog.cache import ResponseCache
+from tap_datadog.concurrency import DEFAULT_MAX_WORKERS
+from tap_datadog.instrumentation import Instrumentation, start_profiling
+from tap_datadog.ratelimit import RateLimitScheduler
+from tap_datadog.serialization import DEFAULT_BUFFER_RECORDS, RecordWriter
+from tap_datadog.session import DEFAULT_POOL_SIZE, build_session
+from tap_datadog.sites import Site, load_sites
 from tap_datadog.streams import (
+    DEFAULT_LOG_EVENTS_PAGE_SIZE,
+    DEFAULT_LOG_EVENTS_SLICE_MINUTES,
+    MAX_LOG_EVENTS_PAGE_SIZE,
     AggregateLogs,
+    LogEvents,
+    LogsAggregate,
     Metric_Response_Time,
-    SLO_History_US_Prod,
-    SLO_History_EU_Prod,
-    SLO_History_CA_Prod,
+    SLO_History,
 )
 
 PLUGIN_NAME = "tap-datadog"
 
 STREAM_TYPES = [ 
     AggregateLogs,
+    LogEvents,
+    LogsAggregate,
     Metric_Response_Time,
-    SLO_History_US_Prod,
-    SLO_History_EU_Prod,
-    SLO_History_CA_Prod,
+    SLO_History,
 ]
 
 class TapDatadog(Tap):
@@ -31,16 +43,204 @@ class TapDatadog(Tap):
 
     name = "tap-datadog"
     config_jsonschema = th.PropertiesList(
-        th.Property("api_key", th.StringType, required=True, description="DD-API-KEY"),
-        th.Property("app_key", th.StringType, required=True, description="DD-APP-KEY"),
+        th.Property("api_key", th.StringType, required=False, description="DD-API-KEY, required unless every entry of sites has its own"),
+        th.Property("app_key", th.StringType, required=False, description="DD-APP-KEY, required unless every entry of sites has its own"),
         th.Property("start_date", th.StringType, required=True, description="start date to sync from"),
+        th.Property("site", th.StringType, required=False, description="Datadog site of the organisation, e.g. datadoghq.eu or us5.datadoghq.com (default datadoghq.com)"),
+        th.Property("api_url", th.StringType, required=False, description="base URL of the Datadog API (default https://api.{site}), e.g. a proxy or the benchmark stub server"),
+        th.Property(
+            "sites",
+            th.ArrayType(
+                th.ObjectType(
+                    th.Property("name", th.StringType, description="name records of this organisation are tagged with (default: its site)"),
+                    th.Property("site", th.StringType, description="Datadog site, e.g. datadoghq.eu"),
+                    th.Property("api_url", th.StringType, description="base URL of the Datadog API (default https://api.{site})"),
+                    th.Property("api_key", th.StringType, description="DD-API-KEY (default: the top-level api_key)"),
+                    th.Property("app_key", th.StringType, description="DD-APP-KEY (default: the top-level app_key)"),
+                    th.Property("aggregate_logs_hosts", th.ArrayType(th.StringType), description="aggregate_logs hosts of this organisation"),
+                    th.Property("slo_ids", th.ArrayType(th.StringType), description="SLOs of this organisation synced by slo_history"),
+                    th.Property("slo_discovery", th.BooleanType, description="discover this organisation's SLOs instead of using slo_ids"),
+                    th.Property("slo_tags_query", th.StringType, description="tags_query filter of this organisation's SLO discovery"),
+                    th.Property("log_events_hosts", th.ArrayType(th.StringType), description="log_events hosts of this organisation"),
+                )
+            ),
+            required=False,
+            description="Datadog organisations synced by one run, each as partitions of every stream, extracted concurrently and tagged with its name; replaces site and api_url",
+        ),
+        th.Property("max_workers", th.IntegerType, required=False, description="maximum number of partitions or slices fetched concurrently (default 4, 1 disables concurrency)"),
+        th.Property("http_pool_size", th.IntegerType, required=False, description="maximum number of pooled keep-alive connections per Datadog host (default: the larger of 10 and max_workers squared)"),
+        th.Property("streaming_json", th.BooleanType, required=False, description="parse aggregate_logs buckets and metric series incrementally as the response arrives (requires ijson); metric_response_time then emits one record per series"),
+        th.Property("metric_api", th.StringType, required=False, description="endpoint metric_response_time queries: 'v1' (default, GET /api/v1/query) or 'v2' (POST /api/v2/query/timeseries, several queries and columnar points per call)"),
+        th.Property("metric_queries", th.ArrayType(th.StringType), required=False, description="query expressions synced by metric_response_time, batched into as few /api/v1/query calls as possible (defaults to trace.aspnet.request.duration{env:production})"),
+        th.Property("metric_group_by", th.ArrayType(th.StringType), required=False, description="tags every metric query is grouped by, unless it has its own 'by {...}' clause"),
+        th.Property("metric_rollup_function", th.StringType, required=False, description="server-side rollup function applied to every metric query without its own .rollup(): avg, sum, min, max or count"),
+        th.Property("metric_rollup_interval", th.IntegerType, required=False, description="server-side rollup interval in seconds, which sets the resolution of the returned points"),
+        th.Property("metric_output", th.StringType, required=False, description="metric_response_time record format: 'nested' (default, series[].pointlist pairs), 'columnar' (series[].timestamps and series[].values arrays) or 'points' (one record per point)"),
+        th.Property("response_cache_dir", th.StringType, required=False, description="directory of an on-disk cache of responses for closed days; disabled when unset"),
+        th.Property("response_cache_ttl", th.IntegerType, required=False, description="seconds a cached response stays valid (default: until evicted)"),
+        th.Property("response_cache_max_mb", th.NumberType, required=False, description="size the response cache is trimmed to, least recently used entries first"),
+        th.Property("response_cache_offline", th.BooleanType, required=False, description="replay from the response cache only, failing on any cache miss"),
+        th.Property("parallel_backfill", th.BooleanType, required=False, description="fetch the date windows of the metric, SLO and aggregate_logs streams concurrently, up to max_workers at a time"),
+        th.Property("aggregate_logs_hosts", th.ArrayType(th.StringType), required=False, description="hosts queried by the aggregate_logs stream, one partition each"),
+        th.Property("aggregate_logs_window", th.StringType, required=False, description="aggregate_logs window size: 'daily' (default) or 'hourly'"),
+        th.Property("aggregate_logs_start_date", th.StringType, required=False, description="date aggregate_logs starts from for hosts without a bookmark (default: yesterday)"),
+        th.Property("aggregate_logs_facet_limit", th.IntegerType, required=False, description="maximum number of values returned per group_by facet in each aggregate_logs request; remaining buckets are fetched with the meta.page.after cursor"),
+        th.Property(
+            "aggregate_queries",
+            th.ArrayType(
+                th.ObjectType(
+                    th.Property("name", th.StringType, description="name of the query, on each of its records as query_name"),
+                    th.Property("query", th.StringType, description="log search filter (default '*')"),
+                    th.Property("indexes", th.ArrayType(th.StringType), description="log indexes searched (default ['main'])"),
+                    th.Property("group_by", th.ArrayType(th.CustomType({"type": ["string", "object"]})), description="facets buckets are grouped by: names, or group_by objects with their own limit, sort or missing"),
+                    th.Property("facet_limit", th.IntegerType, description="maximum number of values per facet, unless a group_by object sets its own limit"),
+                    th.Property("sort", th.CustomType({"type": ["object"]}), description="sort of every facet without its own, e.g. {'aggregation': 'count', 'order': 'desc'}"),
+                    th.Property("computes", th.ArrayType(th.CustomType({"type": ["object"]})), description="values computed per bucket: name, aggregation, optional metric and, for timeseries, interval (default: a count)"),
+                    th.Property("window", th.StringType, description="window size: 'daily' or 'hourly' (default aggregate_logs_window)"),
+                )
+            ),
+            required=False,
+            description="named log aggregate queries synced by the logs_aggregate stream; queries with the same query, indexes, group_by and window share one request",
+        ),
+        th.Property(
+            "log_events_queries",
+            th.ArrayType(
+                th.ObjectType(
+                    th.Property("name", th.StringType, description="name of the query, on each of its events as query_name"),
+                    th.Property("query", th.StringType, description="log search query (default '*')"),
+                    th.Property("indexes", th.ArrayType(th.StringType), description="log indexes searched (default ['main'])"),
+                )
+            ),
+            required=False,
+            description="named log searches synced by the log_events stream, one partition each; the stream syncs nothing without them",
+        ),
+        th.Property("log_events_hosts", th.ArrayType(th.StringType), required=False, description="hosts log_events searches separately, one partition per query and host"),
+        th.Property("log_events_start_date", th.StringType, required=False, description="date log_events starts from for partitions without a bookmark (default: yesterday)"),
+        th.Property("log_events_slice_minutes", th.IntegerType, required=False, description=f"minutes per log_events slice, the unit fetched concurrently and checkpointed (default {DEFAULT_LOG_EVENTS_SLICE_MINUTES})"),
+        th.Property("log_events_page_size", th.IntegerType, required=False, description=f"events per log_events search page (default {DEFAULT_LOG_EVENTS_PAGE_SIZE}, at most {MAX_LOG_EVENTS_PAGE_SIZE})"),
+        th.Property("slo_ids", th.ArrayType(th.StringType), required=False, description="IDs of the SLOs synced by the slo_history stream, one partition each (defaults to the prod US, EU and CA SLOs)"),
+        th.Property("slo_discovery", th.BooleanType, required=False, description="sync every SLO listed by /api/v1/slo instead of slo_ids"),
+        th.Property("slo_tags_query", th.StringType, required=False, description="tags_query filter applied to SLO discovery, e.g. 'env:prod'"),
+        th.Property("window_mode", th.StringType, required=False, description="date windows for the metric and SLO streams: 'month_to_date' (default, overlapping first-of-month windows) or 'daily' (non-overlapping windows)"),
+        th.Property("window_days", th.IntegerType, required=False, description="number of days per window in 'daily' window mode (default 1)"),
+        th.Property("fast_records", th.BooleanType, required=False, description="write RECORD messages through a per-stream compiled fast path, encoded with orjson when installed and written to stdout in batches"),
+        th.Property("record_buffer_size", th.IntegerType, required=False, description="RECORD messages buffered before each write to stdout with fast_records (default 1000)"),
+        th.Property("record_validation", th.StringType, required=False, description="JSON Schema validation of records with fast_records: 'off' (default), 'sample' or 'all'; invalid records are logged"),
+        th.Property("record_validation_sample_rate", th.IntegerType, required=False, description="in 'sample' record_validation, validate one in this many records (default 100)"),
+        th.Property(
+            "batch_config",
+            th.ObjectType(
+                th.Property(
+                    "encoding",
+                    th.ObjectType(
+                        th.Property("format", th.StringType, description="batch file format: 'jsonl'"),
+                        th.Property("compression", th.StringType, description="'gzip' (default) or 'zstd' (requires zstandard)"),
+                    ),
+                ),
+                th.Property(
+                    "storage",
+                    th.ObjectType(
+                        th.Property("root", th.StringType, description="directory batch files are written to, e.g. file:///tmp/batches"),
+                        th.Property("prefix", th.StringType, description="prefix of the batch file names"),
+                    ),
+                ),
+                th.Property("batch_size", th.IntegerType, description=f"records per batch file (default {DEFAULT_BATCH_SIZE})"),
+            ),
+            required=False,
+            description="write records to compressed JSONL files announced by BATCH messages instead of RECORD messages",
+        ),
+        th.Property("metrics_summary_path", th.StringType, required=False, description="file the JSON run summary of per-stream and per-partition performance measurements is written to at exit"),
+        th.Property("profile_trace_path", th.StringType, required=False, description="file a viztracer trace of the sync is saved to (requires the dev dependencies)"),
+        th.Property("slo_month_to_date", th.BooleanType, required=False, description="in 'daily' window mode, also emit one month-to-date SLO history record per month"),
     ).to_dict()
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.config.get("metrics_summary_path"):
+            atexit.register(self.instrumentation.write_summary, self.config["metrics_summary_path"])
+        if self.config.get("profile_trace_path"):
+            start_profiling(self.config["profile_trace_path"])
+
+    @cached_property
+    def instrumentation(self) -> Instrumentation:
+        """Return the performance measurements shared by all streams of this tap."""
+        return Instrumentation()
+
+    @cached_property
+    def sites(self) -> List[Site]:
+        """Return the Datadog organisations extracted from, from `sites` or the top-level keys."""
+        return load_sites(self.config)
+
+    @cached_property
+    def multi_site(self) -> bool:
+        """Return True if `sites` is set, making every site a partition of every stream."""
+        return bool(self.config.get("sites"))
+
+    @cached_property
+    def batch_config(self) -> Optional[BatchConfig]:
+        """Return the batch file settings, if `batch_config` is set."""
+        if not self.config.get("batch_config"):
+            return None
+        return BatchConfig.from_config(self.config["batch_config"])
+
+    @cached_property
+    def record_writer(self) -> RecordWriter:
+        """Return the buffered stdout writer shared by all streams using `fast_records`."""
+        return RecordWriter(self.config.get("record_buffer_size", DEFAULT_BUFFER_RECORDS))
+
+    @cached_property
+    def rate_limit_scheduler(self) -> RateLimitScheduler:
+        """Return the rate-limit scheduler shared by all streams of this tap."""
+        return RateLimitScheduler()
+
+    @cached_property
+    def requests_session(self) -> requests.Session:
+        """Return the pooled keep-alive session shared by all streams of this tap.
+
+        Partitions and their windows can both be fetched `max_workers` at a
+        time, so the pool defaults to one connection per possible request.
+        """
+        max_workers = self.config.get("max_workers", DEFAULT_MAX_WORKERS)
+        pool_size = self.config.get("http_pool_size") or max(DEFAULT_POOL_SIZE, max_workers ** 2)
+        return build_session(pool_size)
+
+    @cached_property
+    def response_cache(self) -> Optional[ResponseCache]:
+        """Return the on-disk response cache, if `response_cache_dir` is set."""
+        if not self.config.get("response_cache_dir"):
+            return None
+        max_mb = self.config.get("response_cache_max_mb")
+        return ResponseCache(
+            self.config["response_cache_dir"],
+            ttl=self.config.get("response_cache_ttl"),
+            max_bytes=int(max_mb * 2 ** 20) if max_mb else None,
+            offline=self.config.get("response_cache_offline", False),
+        )
+
+    @cached_property
+    def _singer_catalog(self) -> Catalog:
+        """Return the discovered catalog, built once rather than on every access."""
+        return super()._singer_catalog
+
     def discover_streams(self) -> List[Stream]:
-        """Return a list of discovered streams."""
-        streams =  [stream_class(tap=self) for stream_class in STREAM_TYPES]
+        """Return a list of discovered streams.
+
+        With an input catalog, only the streams it selects are constructed, so a
+        run of one stream skips the setup of all the others.
+        """
+        stream_types = STREAM_TYPES
+        if self.input_catalog is not None:
+            stream_types = [
+                stream_class
+                for stream_class in STREAM_TYPES
+                if self._is_selected(self.input_catalog.get_stream(stream_class.name))
+            ]
+        return [stream_class(tap=self) for stream_class in stream_types]
 
-        return streams
+    @staticmethod
+    def _is_selected(catalog_entry) -> bool:
+        """Return False only if a catalog entry deselects its stream, as `Stream.selected` would."""
+        return catalog_entry is None or catalog_entry.metadata.resolve_selection().get((), True)
 
 # CLI Execution:
 cli = TapDatadog.cli
\ No newline at end of file
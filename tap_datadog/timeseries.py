@@ -0,0 +1,121 @@
+"""Requests and responses of the v2 `/api/v2/query/timeseries` endpoint.
+
+One request evaluates several metric queries over a window and returns their
+points as shared `times` and per-series `values` columns. Responses are
+converted to the record shape of `/api/v1/query`, with each series holding
+`timestamps`/`values` columns instead of a `pointlist`.
+"""
+
+import re
+from typing import List, Optional, Sequence
+
+TIMESERIES_PATH = "/api/v2/query/timeseries"
+
+# Number of queries sent in one timeseries request.
+TIMESERIES_BATCH_SIZE = 20
+
+_AGGREGATOR = re.compile(r"^(avg|sum|min|max):")
+_SCOPE = re.compile(r"\{([^}]*)\}")
+_GROUP_BY = re.compile(r"\s+by\s+\{[^}]*\}")
+_ROLLUP_INTERVAL = re.compile(r"\.rollup\([^)]*?(\d+)\s*\)")
+
+
+def with_aggregator(query: str, aggregator: str = "avg") -> str:
+    """Return a query with a space aggregator, which the v2 endpoint requires."""
+    if _AGGREGATOR.match(query):
+        return query
+    return f"{aggregator}:{query}"
+
+
+def space_aggregator(query: str) -> Optional[str]:
+    """Return the space aggregator of a query expression, the v1 `aggregation`."""
+    match = _AGGREGATOR.match(query)
+    return match.group(1) if match else None
+
+
+def series_interval(query: str, times: Sequence[int]) -> Optional[int]:
+    """Return the v1 `interval` of a series: the seconds between its points."""
+    if len(times) >= 2:
+        return (times[1] - times[0]) // 1000
+    match = _ROLLUP_INTERVAL.search(query)
+    return int(match.group(1)) if match else None
+
+
+def metric_name(query: str) -> str:
+    """Return the metric name of a query expression."""
+    return _AGGREGATOR.sub("", query).split("{", 1)[0].strip()
+
+
+def query_scope(query: str) -> Optional[str]:
+    """Return the tag filter of a query expression."""
+    match = _SCOPE.search(query)
+    return match.group(1) if match else None
+
+
+def series_scope(query: str, tag_set: Sequence[str]) -> str:
+    """Return the v1 `scope` of a series: the query's filter plus its group tags."""
+    tags = [tag for tag in (query_scope(query) or "").split(",") if tag and tag != "*"]
+    return ",".join(tags + list(tag_set)) or "*"
+
+
+def series_expression(query: str, scope: str) -> str:
+    """Return the v1 `expression` of a series: the query narrowed to its scope."""
+    return _SCOPE.sub(lambda _: f"{{{scope}}}", _GROUP_BY.sub("", query), count=1)
+
+
+def timeseries_payload(queries: Sequence[str], from_ms: int, to_ms: int) -> dict:
+    """Return the request body evaluating each query as its own formula."""
+    return {
+        "data": {
+            "type": "timeseries_request",
+            "attributes": {
+                "from": from_ms,
+                "to": to_ms,
+                "queries": [
+                    {"data_source": "metrics", "name": f"q{index}", "query": query}
+                    for index, query in enumerate(queries)
+                ],
+                "formulas": [{"formula": f"q{index}"} for index in range(len(queries))],
+            },
+        }
+    }
+
+
+def timeseries_record(body: dict, payload: dict) -> dict:
+    """Return a v1-shaped query record for a timeseries response.
+
+    Args:
+        body: The decoded response.
+        payload: The request body, which holds the queries the series refer to.
+    """
+    request = payload["data"]["attributes"]
+    queries: List[str] = [query["query"] for query in request["queries"]]
+    attributes = (body.get("data") or {}).get("attributes") or {}
+    times = attributes.get("times") or []
+    values = attributes.get("values") or []
+
+    series = []
+    for index, meta in enumerate(attributes.get("series") or []):
+        query_index = meta.get("query_index", index)
+        query = queries[query_index]
+        tag_set = meta.get("group_tags") or []
+        scope = series_scope(query, tag_set)
+        series.append(
+            {
+                "metric": metric_name(query),
+                "scope": scope,
+                "expression": series_expression(query, scope),
+                "tag_set": tag_set,
+                "aggregation": space_aggregator(query),
+                "interval": series_interval(query, times),
+                "query_index": query_index,
+                "timestamps": times,
+                "values": values[index] if index < len(values) else [],
+            }
+        )
+    return {
+        "query": ",".join(queries),
+        "from_date": request["from"],
+        "to_date": request["to"],
+        "series": series,
+    }
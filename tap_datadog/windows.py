@@ -0,0 +1,157 @@
+"""Date window helpers for the date-cursored Datadog streams."""
+
+import calendar
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+
+WINDOW_MODE_MONTH_TO_DATE = "month_to_date"
+WINDOW_MODE_DAILY = "daily"
+WINDOW_MODE_HOURLY = "hourly"
+WINDOW_MODES = [WINDOW_MODE_MONTH_TO_DATE, WINDOW_MODE_DAILY, WINDOW_MODE_HOURLY]
+
+
+class Window(NamedTuple):
+    """A [start, end) epoch range requested from the API.
+
+    `cursor` is set on the pagination tokens of pages after the first.
+    """
+
+    start: int
+    end: int
+    kind: str = "day"
+    cursor: Optional[str] = None
+
+
+class Checkpoint(NamedTuple):
+    """Marks the end of a completed window in a stream's records.
+
+    `value` is the bookmark from which a resumed sync starts.
+    """
+
+    value: Any
+
+
+def to_epoch_seconds(value: float) -> int:
+    """Return an epoch in seconds, accepting bookmarks stored in milliseconds."""
+    value = int(value)
+    if value > 10 ** 11:
+        return value // 1000
+    return value
+
+
+def parse_start_date(start_date: str) -> int:
+    """Return the UTC midnight epoch of a `start_date` config value."""
+    date = datetime.strptime(start_date[:10], "%Y-%m-%d")
+    return calendar.timegm(date.timetuple())
+
+
+def floor_to_day(epoch: int) -> int:
+    """Return the UTC midnight at or before `epoch`."""
+    return epoch - epoch % SECONDS_PER_DAY
+
+
+def first_of_month_epoch(epoch: int) -> int:
+    """Return the UTC midnight of the first day of the month containing `epoch`."""
+    date = datetime.fromtimestamp(epoch, tz=timezone.utc)
+    return calendar.timegm((date.year, date.month, 1, 0, 0, 0))
+
+
+def closed_days_end(now: Optional[int] = None) -> int:
+    """Return the end of the last fully closed UTC day."""
+    return floor_to_day(int(time.time()) if now is None else now)
+
+
+def closed_hours_end(now: Optional[int] = None) -> int:
+    """Return the end of the last fully closed UTC hour."""
+    now = int(time.time()) if now is None else now
+    return now - now % SECONDS_PER_HOUR
+
+
+def hour_windows(start: int, end: int) -> List[Window]:
+    """Return consecutive one-hour windows covering [start, end)."""
+    cursor = start - start % SECONDS_PER_HOUR
+    return [
+        Window(hour, min(hour + SECONDS_PER_HOUR, end), "hour")
+        for hour in range(cursor, end, SECONDS_PER_HOUR)
+    ]
+
+
+def slice_windows(start: int, end: int, span_seconds: int) -> List[Window]:
+    """Return consecutive windows covering [start, end), split every `span_seconds`.
+
+    Splits fall on multiples of the span, so a sync resuming from a bookmark
+    inside a slice only requests the rest of it.
+    """
+    span = max(int(span_seconds), 1)
+    windows = []
+    cursor = start
+    while cursor < end:
+        slice_end = min(cursor - cursor % span + span, end)
+        windows.append(Window(cursor, slice_end, "slice"))
+        cursor = slice_end
+    return windows
+
+
+def month_to_date_windows(start: int, end: int) -> List[Window]:
+    """Return one growing first-of-month window per day between start and end.
+
+    This is the original behaviour of the date-cursored streams: each request
+    covers the month so far, so consecutive windows overlap.
+    """
+    windows = []
+    cursor = start
+    while cursor < end:
+        cursor += SECONDS_PER_DAY
+        windows.append(
+            Window(first_of_month_epoch(cursor - 1), cursor, WINDOW_MODE_MONTH_TO_DATE)
+        )
+    return windows
+
+
+def day_windows(
+    start: int, end: int, span_days: int = 1, month_to_date: bool = False
+) -> List[Window]:
+    """Return non-overlapping windows of `span_days` covering [start, end).
+
+    Windows never cross a month boundary. With `month_to_date`, a single
+    first-of-month window is added after the last day window of every month,
+    even when that day window already spans the whole month.
+    """
+    windows: List[Window] = []
+    span = max(int(span_days), 1) * SECONDS_PER_DAY
+    cursor = floor_to_day(start)
+    while cursor < end:
+        month_start = first_of_month_epoch(cursor)
+        next_month = first_of_month_epoch(month_start + 32 * SECONDS_PER_DAY)
+        window_end = min(cursor + span, next_month, end)
+        windows.append(Window(cursor, window_end))
+        closes_month = window_end in (next_month, end)
+        if month_to_date and closes_month:
+            windows.append(Window(month_start, window_end, WINDOW_MODE_MONTH_TO_DATE))
+        cursor = window_end
+    return windows
+
+
+@lru_cache(maxsize=128)
+def plan_windows(
+    mode: str,
+    start: int,
+    end: int,
+    span_days: int = 1,
+    month_to_date: bool = False,
+) -> Tuple[Window, ...]:
+    """Return the windows between start and end for a window mode.
+
+    Results are cached, so partitions sharing the same bookmark (e.g. every SLO
+    on a first sync) compute the date math only once.
+    """
+    if mode == WINDOW_MODE_DAILY:
+        return tuple(day_windows(start, end, span_days, month_to_date))
+    if mode == WINDOW_MODE_HOURLY:
+        return tuple(hour_windows(start, end))
+    return tuple(month_to_date_windows(start, end))
@@ -0,0 +1,7 @@
+"""Shared fixtures for the tap-datadog tests."""
+
+import sys
+from pathlib import Path
+
+# The local Datadog stub server lives with the benchmarks.
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
@@ -0,0 +1,83 @@
+"""Tests for the named log aggregate queries."""
+
+from datetime import datetime, timezone
+
+from stub_server import StubOptions, StubServer
+
+from tap_datadog.aggregates import AggregateQuery, group_queries
+from tap_datadog.tap import TapDatadog
+from tap_datadog.windows import SECONDS_PER_DAY, closed_days_end
+
+QUERIES = [
+    {"name": "errors", "query": "status:error", "group_by": ["service"]},
+    {
+        "name": "slow",
+        "query": "status:error",
+        "group_by": ["service"],
+        "computes": [{"name": "p95", "aggregation": "pc95", "metric": "@duration"}],
+    },
+    {"name": "all", "query": "*", "group_by": ["service"]},
+]
+
+
+def test_queries_sharing_a_request_are_grouped():
+    groups = group_queries([AggregateQuery.from_config(entry) for entry in QUERIES])
+    assert [group.name for group in groups] == ["errors,slow", "all"]
+    errors_slow = groups[0]
+    assert errors_slow.computes == [
+        {"aggregation": "count", "type": "total"},
+        {"aggregation": "pc95", "type": "total", "metric": "@duration"},
+    ]
+    bucket = {"by": {"service": "web"}, "computes": {"c0": 3, "c1": 120.5}}
+    assert list(errors_slow.split(bucket)) == [
+        {"query_name": "errors", "by": {"service": "web"}, "computes": {"c0": 3}},
+        {"query_name": "slow", "by": {"service": "web"}, "computes": {"p95": 120.5}},
+    ]
+
+
+def bookmark(queries: str, value: int) -> dict:
+    return {
+        "context": {"queries": queries},
+        "replication_key": "window_end",
+        "replication_key_value": value,
+    }
+
+
+def test_regrouped_queries_keep_their_bookmarks():
+    end = closed_days_end()
+    start = datetime.fromtimestamp(end - 10 * SECONDS_PER_DAY, tz=timezone.utc)
+    # `errors` and `slow` used to be requested separately, and are now grouped.
+    state = {
+        "bookmarks": {
+            "logs_aggregate": {
+                "partitions": [
+                    bookmark("errors", end - SECONDS_PER_DAY),
+                    bookmark("slow", end - 3 * SECONDS_PER_DAY),
+                ]
+            }
+        }
+    }
+    with StubServer(StubOptions(buckets=2, pages=1)) as stub:
+        tap = TapDatadog(
+            config={
+                "api_key": "key",
+                "app_key": "app",
+                "start_date": "2022-01-01",
+                "aggregate_logs_start_date": start.strftime("%Y-%m-%d"),
+                "aggregate_queries": QUERIES[:2],
+                "api_url": stub.url,
+            },
+            state=state,
+            parse_env_config=False,
+        )
+        stream = tap.streams["logs_aggregate"]
+        records = [
+            row for row in stream.request_records({"queries": "errors,slow"}) if isinstance(row, dict)
+        ]
+
+    def window_ends(name: str) -> list:
+        return sorted({row["window_end"] for row in records if row["query_name"] == name})
+
+    assert window_ends("errors") == [end]
+    assert window_ends("slow") == [end - days * SECONDS_PER_DAY for days in (2, 1, 0)]
+    assert stub.requests["/api/v2/logs/analytics/aggregate"] == 3
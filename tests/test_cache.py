@@ -0,0 +1,181 @@
+"""Tests for the on-disk response cache."""
+
+import os
+import threading
+
+import pytest
+import requests
+from singer_sdk.exceptions import FatalAPIError
+from stub_server import StubOptions, StubServer
+
+from tap_datadog import cache as cache_module
+from tap_datadog.cache import ResponseCache
+from tap_datadog.tap import TapDatadog
+from tap_datadog.windows import SECONDS_PER_DAY, Window, closed_days_end
+
+SLO_HISTORY = "/api/v1/slo/history"
+
+
+def prepared(url: str) -> requests.PreparedRequest:
+    return requests.Request("GET", url, headers={"DD-API-KEY": "key"}).prepare()
+
+
+def response(body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response.url = "https://api.datadoghq.com/api/v1/query"
+    response.headers = requests.structures.CaseInsensitiveDict(
+        {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    )
+    response._content = body
+    return response
+
+
+def age(cache: ResponseCache, request: requests.PreparedRequest, seconds: float) -> None:
+    """Set an entry's last use `seconds` into the past."""
+    used = os.stat(cache.directory / f"{cache.key(request)}.body").st_mtime - seconds
+    for suffix in ("json", "body"):
+        os.utime(cache.directory / f"{cache.key(request)}.{suffix}", (used, used))
+
+
+def test_miss_then_hit(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    request = prepared("https://api.datadoghq.com/api/v1/query?from=0&to=86400")
+    assert cache.get(request) is None
+    cache.put(request, response(b'{"series": []}'))
+
+    cached = cache.get(request)
+    assert cached.from_cache
+    assert cached.json() == {"series": []}
+    assert "Content-Encoding" not in cached.headers
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.get(prepared("https://api.datadoghq.com/api/v1/query?from=0&to=3600")) is None
+
+
+def test_entries_are_keyed_by_api_key(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    request = prepared("https://api.datadoghq.com/api/v1/query")
+    cache.put(request, response(b"{}"))
+    request.headers["DD-API-KEY"] = "other"
+    assert cache.get(request) is None
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    request = prepared("https://api.datadoghq.com/api/v1/query")
+    cache.put(request, response(b"{}"))
+    assert cache.get(request) is not None
+
+    now = cache_module.time.time()
+    monkeypatch.setattr(cache_module.time, "time", lambda: now + 61)
+    assert cache.get(request) is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    first, second, third = (
+        prepared(f"https://api.datadoghq.com/api/v1/query?from={start}") for start in range(3)
+    )
+    cache.put(first, response(b"x" * 1000))
+    entry_bytes = sum(path.stat().st_size for path in tmp_path.iterdir())
+    cache.put(second, response(b"x" * 1000))
+    age(cache, first, 20)
+    age(cache, second, 10)
+    # Reading the first entry makes the second the least recently used.
+    assert cache.get(first) is not None
+
+    # Room for two entries, whose metadata can differ by a few bytes.
+    cache.max_bytes = int(2.5 * entry_bytes)
+    cache.put(third, response(b"x" * 1000))
+    assert cache.get(second) is None
+    assert cache.get(first) is not None
+    assert cache.get(third) is not None
+
+
+def test_max_mb_setting_sets_the_size_limit(tmp_path):
+    tap = TapDatadog(
+        config={
+            "api_key": "key",
+            "app_key": "app",
+            "start_date": "2022-01-01",
+            "response_cache_dir": str(tmp_path),
+            "response_cache_max_mb": 0.5,
+        },
+        parse_env_config=False,
+    )
+    assert tap.response_cache.max_bytes == 2 ** 19
+
+
+@pytest.fixture
+def stub():
+    with StubServer(StubOptions(points=24)) as stub:
+        yield stub
+
+
+def slo_history(stub: StubServer, directory: str, **config):
+    tap = TapDatadog(
+        config={
+            "api_key": "key",
+            "app_key": "app",
+            "start_date": "2022-01-01",
+            "slo_ids": ["0" * 32],
+            "api_url": stub.url,
+            "response_cache_dir": directory,
+            **config,
+        },
+        parse_env_config=False,
+    )
+    return tap.streams["slo_history"]
+
+
+def test_closed_windows_are_replayed(stub, tmp_path):
+    end = closed_days_end()
+    window = Window(end - SECONDS_PER_DAY, end)
+    context = {"slo_id": "0" * 32}
+    records = list(slo_history(stub, str(tmp_path)).request_window(context, window))
+    assert stub.requests[SLO_HISTORY] == 1
+
+    replayed = slo_history(stub, str(tmp_path), response_cache_offline=True)
+    assert list(replayed.request_window(context, window)) == records
+    assert stub.requests[SLO_HISTORY] == 1
+
+
+def test_open_day_is_never_stored(stub, tmp_path):
+    start = closed_days_end()
+    window = Window(start, start + SECONDS_PER_DAY)
+    context = {"slo_id": "0" * 32}
+    stream = slo_history(stub, str(tmp_path))
+    list(stream.request_window(context, window))
+    list(stream.request_window(context, window))
+    assert stub.requests[SLO_HISTORY] == 2
+    assert stream._tap.response_cache.hits == 0
+    assert not list(tmp_path.iterdir())
+
+
+def test_offline_miss_is_fatal(stub, tmp_path):
+    end = closed_days_end()
+    stream = slo_history(stub, str(tmp_path), response_cache_offline=True)
+    with pytest.raises(FatalAPIError, match="offline replay mode"):
+        list(stream.request_window({"slo_id": "0" * 32}, Window(end - SECONDS_PER_DAY, end)))
+    assert stub.requests[SLO_HISTORY] == 0
+
+
+def test_hits_and_misses_are_counted_across_threads(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cached = prepared("https://api.datadoghq.com/api/v1/query?from=0")
+    missing = prepared("https://api.datadoghq.com/api/v1/query?from=1")
+    cache.put(cached, response(b"{}"))
+
+    def read():
+        for _ in range(200):
+            cache.get(cached)
+            cache.get(missing)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (cache.hits, cache.misses) == (1600, 1600)
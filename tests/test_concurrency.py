@@ -0,0 +1,70 @@
+"""Tests for the ordered concurrent fetching of partitions and windows."""
+
+import threading
+
+import pytest
+
+from tap_datadog.concurrency import OrderedPrefetcher
+
+
+class Units:
+    """Fetches numbered units, tracking how many run ahead of the consumer."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = 0
+        self.consumed = 0
+        self.most_ahead = 0
+
+    def fetch(self, unit: int):
+        with self.lock:
+            self.started += 1
+            self.most_ahead = max(self.most_ahead, self.started - self.consumed)
+        for item in range(3):
+            yield (unit, item)
+
+    def consume(self, prefetcher: OrderedPrefetcher, units: list) -> list:
+        items = []
+        for unit in units:
+            items.extend(prefetcher.results(unit))
+            with self.lock:
+                self.consumed += 1
+        return items
+
+
+def test_units_are_replayed_in_order():
+    units = Units()
+    prefetcher = OrderedPrefetcher(units.fetch, max_workers=4)
+    prefetcher.start(range(20))
+    items = units.consume(prefetcher, range(20))
+    assert items == [(unit, item) for unit in range(20) for item in range(3)]
+    assert prefetcher.pending == 0
+
+
+@pytest.mark.parametrize("count", [10, 200])
+def test_units_are_submitted_a_few_at_a_time(count):
+    units = Units()
+    prefetcher = OrderedPrefetcher(units.fetch, max_workers=4)
+    prefetcher.start(range(count))
+    assert prefetcher.submitted == 4
+    assert prefetcher.pending == count
+    assert all(unit in prefetcher for unit in range(count))
+
+    units.consume(prefetcher, range(count))
+    assert units.started == count
+    # The unit being consumed, and at most `max_workers` after it.
+    assert units.most_ahead <= 5
+
+
+def test_errors_are_raised_in_order():
+    def fetch(unit: int):
+        if unit == 3:
+            raise ValueError("unit 3")
+        yield unit
+
+    prefetcher = OrderedPrefetcher(fetch, max_workers=2)
+    prefetcher.start(range(6))
+    assert [item for unit in range(3) for item in prefetcher.results(unit)] == [0, 1, 2]
+    with pytest.raises(ValueError, match="unit 3"):
+        list(prefetcher.results(3))
+    assert prefetcher.pending == 0
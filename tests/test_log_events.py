@@ -0,0 +1,43 @@
+"""Tests for the log_events stream."""
+
+from stub_server import StubOptions, StubServer
+
+from tap_datadog.tap import TapDatadog
+
+LOG_EVENTS = "/api/v2/logs/events/search"
+
+
+def log_events(stub: StubServer, **config):
+    tap = TapDatadog(
+        config={
+            "api_key": "key",
+            "app_key": "app",
+            "start_date": "2022-01-01",
+            "log_events_slice_minutes": 60,
+            "api_url": stub.url,
+            **config,
+        },
+        parse_env_config=False,
+    )
+    return tap.streams["log_events"]
+
+
+def test_nothing_is_synced_without_queries():
+    with StubServer(StubOptions(events=5)) as stub:
+        stream = log_events(stub)
+        assert not stream.partitions
+        assert list(stream.request_records({})) == []
+        assert stub.requests[LOG_EVENTS] == 0
+
+
+def test_each_query_is_a_partition():
+    with StubServer(StubOptions(events=5)) as stub:
+        queries = [{"name": "errors", "query": "status:error"}, {"name": "all"}]
+        stream = log_events(stub, log_events_queries=queries)
+        assert stream.partitions == [{"query_name": "errors"}, {"query_name": "all"}]
+
+        context = {"query_name": "errors"}
+        slices = stream.get_windows(context)
+        records = [row for row in stream.request_records(context) if isinstance(row, dict)]
+        assert len(records) == 5 * len(slices)
+        assert stub.requests[LOG_EVENTS] == len(slices)
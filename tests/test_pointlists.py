@@ -0,0 +1,40 @@
+"""Tests for the metric record output formats."""
+
+from tap_datadog.pointlists import (
+    METRIC_OUTPUT_COLUMNAR,
+    METRIC_OUTPUT_NESTED,
+    METRIC_OUTPUT_POINTS,
+    format_metric_record,
+    series_columns,
+)
+
+RECORD = {
+    "query": "avg:hits{*}",
+    "series": [
+        {
+            "metric": "hits",
+            "scope": "*",
+            "pointlist": [[1600000000000.0, 1.5], [1600000060000.0, None]],
+        }
+    ],
+}
+
+
+def test_series_columns_of_pointlist_and_columns():
+    columns = ([1600000000000, 1600000060000], [1.5, None])
+    assert series_columns(RECORD["series"][0]) == columns
+    assert series_columns({"timestamps": columns[0], "values": columns[1]}) == columns
+
+
+def test_output_formats_carry_the_same_points():
+    nested = list(format_metric_record(RECORD, METRIC_OUTPUT_NESTED))
+    columnar = list(format_metric_record(RECORD, METRIC_OUTPUT_COLUMNAR))
+    points = list(format_metric_record(RECORD, METRIC_OUTPUT_POINTS))
+    assert nested == [RECORD]
+    assert columnar[0]["series"][0]["timestamps"] == [1600000000000, 1600000060000]
+    assert columnar[0]["series"][0]["values"] == [1.5, None]
+    assert [(point["timestamp"], point["value"]) for point in points] == [
+        (1600000000000, 1.5),
+        (1600000060000, None),
+    ]
+    assert all(point["metric"] == "hits" for point in points)
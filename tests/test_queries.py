@@ -0,0 +1,45 @@
+"""Tests for metric query building and batching."""
+
+import pytest
+
+from tap_datadog.queries import batch_queries, build_metric_query
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("avg:trace.duration{env:prod}", "avg:trace.duration{env:prod} by {host}"),
+        ("avg:trace.duration{*}.as_count()", "avg:trace.duration{*} by {host}.as_count()"),
+        ("sum:hits{*}.fill(zero).rollup(sum, 60)", "sum:hits{*} by {host}.fill(zero).rollup(sum, 60)"),
+        ("avg:system.cpu.user.as_count()", "avg:system.cpu.user by {host}.as_count()"),
+        ("avg:hits{*} by {service}.as_count()", "avg:hits{*} by {service}.as_count()"),
+    ],
+)
+def test_group_by_goes_after_the_scope(query, expected):
+    assert build_metric_query(query, group_by=["host"]) == expected
+
+
+def test_arithmetic_groups_and_rolls_up_every_term():
+    query = "(sum:errors{env:prod}.as_count() / sum:hits{env:prod} by {host}.as_count()) * 100"
+    assert build_metric_query(query, group_by=["host"], rollup_function="sum", rollup_interval=60) == (
+        "(sum:errors{env:prod} by {host}.as_count().rollup(sum, 60)"
+        " / sum:hits{env:prod} by {host}.as_count().rollup(sum, 60)) * 100"
+    )
+    assert build_metric_query("abs(avg:a{*}.rollup(max)) - avg:b{*}", rollup_function="sum") == (
+        "abs(avg:a{*}.rollup(max)) - avg:b{*}.rollup(sum)"
+    )
+
+
+def test_rollup_is_appended_unless_present():
+    assert (
+        build_metric_query("avg:hits{*}.as_count()", rollup_function="sum", rollup_interval=60)
+        == "avg:hits{*}.as_count().rollup(sum, 60)"
+    )
+    assert build_metric_query("avg:hits{*}.rollup(max)", rollup_function="sum") == "avg:hits{*}.rollup(max)"
+
+
+def test_batches_respect_length_and_count():
+    queries = [f"avg:metric.{index}{{*}}" for index in range(10)]
+    batches = batch_queries(queries, max_length=60, max_count=3)
+    assert [query for batch in batches for query in batch] == queries
+    assert all(len(batch) <= 3 and len(",".join(batch)) <= 60 for batch in batches)
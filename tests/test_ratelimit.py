@@ -0,0 +1,182 @@
+"""Tests for the rate-limit pacing of requests."""
+
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+import requests
+from stub_server import StubOptions, StubServer
+from typing import Optional
+
+from tap_datadog.ratelimit import (
+    LIMIT_HEADER,
+    PERIOD_HEADER,
+    REMAINING_HEADER,
+    RESET_HEADER,
+    TokenBucket,
+)
+from tap_datadog.tap import TapDatadog
+from tap_datadog.windows import SECONDS_PER_DAY, Window, closed_days_end
+
+SLO_ID = "0" * 32
+SLO_HISTORY = "/api/v1/slo/history"
+
+
+class Clock:
+    """A monotonic clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def headers(limit: int, period: int, remaining: int, reset: float = 1) -> dict:
+    return {
+        LIMIT_HEADER: str(limit),
+        PERIOD_HEADER: str(period),
+        REMAINING_HEADER: str(remaining),
+        RESET_HEADER: str(reset),
+    }
+
+
+def acquire_in_thread(bucket: TokenBucket, waits: Optional[list] = None) -> threading.Thread:
+    """Start a thread acquiring from `bucket`, appending its wait to `waits`."""
+    waits = [] if waits is None else waits
+    thread = threading.Thread(target=lambda: waits.append(bucket.acquire()), daemon=True)
+    thread.start()
+    return thread
+
+
+def test_first_request_is_sent_alone():
+    bucket = TokenBucket()
+    assert bucket.acquire() == pytest.approx(0, abs=0.05)
+    waiting = acquire_in_thread(bucket)
+    waiting.join(0.2)
+    assert waiting.is_alive()
+
+    bucket.update(headers(limit=100, period=10, remaining=99))
+    waiting.join(1)
+    assert not waiting.is_alive()
+    assert bucket.refill_rate == 10
+
+
+def test_failed_first_request_lets_the_next_one_probe():
+    bucket = TokenBucket()
+    bucket.acquire()
+    bucket.update(None)
+    bucket.acquire()
+    waiting = acquire_in_thread(bucket)
+    waiting.join(0.2)
+    assert waiting.is_alive()
+    bucket.update({})
+    waiting.join(1)
+    assert not waiting.is_alive()
+
+
+def test_families_without_headers_are_not_paced():
+    bucket = TokenBucket()
+    bucket.acquire()
+    bucket.update({"Content-Type": "application/json"})
+    for _ in range(10):
+        assert bucket.acquire() == pytest.approx(0, abs=0.05)
+
+
+def test_requests_are_paced_from_headers():
+    clock = Clock()
+    bucket = TokenBucket(clock)
+    bucket.acquire()
+    # Two requests a second, one of which is still available.
+    bucket.update(headers(limit=10, period=5, remaining=1))
+    assert bucket.acquire() == 0
+
+    waits: list = []
+    waiting = acquire_in_thread(bucket, waits)
+    waiting.join(0.1)
+    assert waiting.is_alive()
+    clock.now += 0.5
+    waiting.join(1)
+    assert waits == [0.5]
+
+
+def test_used_up_allowance_holds_requests_until_reset():
+    clock = Clock()
+    bucket = TokenBucket(clock)
+    bucket.acquire()
+    bucket.update(headers(limit=100, period=10, remaining=0, reset=0.3))
+
+    waits: list = []
+    waiting = acquire_in_thread(bucket, waits)
+    waiting.join(0.1)
+    assert waiting.is_alive()
+    clock.now += 0.3
+    waiting.join(1)
+    assert waits == [pytest.approx(0.3)]
+
+
+def test_block_holds_every_waiting_request():
+    clock = Clock()
+    bucket = TokenBucket(clock)
+    bucket.acquire()
+    bucket.update(headers(limit=100, period=1, remaining=100))
+    bucket.block(0.2)
+
+    waits: list = []
+    waiting = [acquire_in_thread(bucket, waits) for _ in range(3)]
+    for thread in waiting:
+        thread.join(0.05)
+    assert all(thread.is_alive() for thread in waiting)
+    clock.now += 0.2
+    for thread in waiting:
+        thread.join(1)
+    assert waits == [pytest.approx(0.2)] * 3
+
+
+def slo_history(stub: StubServer, **config):
+    tap = TapDatadog(
+        config={
+            "api_key": "key",
+            "app_key": "app",
+            "start_date": "2022-01-01",
+            "window_mode": "daily",
+            "slo_ids": [SLO_ID],
+            "api_url": stub.url,
+            **config,
+        },
+        parse_env_config=False,
+    )
+    return tap.streams["slo_history"]
+
+
+def test_concurrent_windows_stay_under_the_limit():
+    with StubServer(StubOptions(points=24, rate_limit=3, rate_period=1)) as stub:
+        start = datetime.fromtimestamp(closed_days_end() - 8 * SECONDS_PER_DAY, tz=timezone.utc)
+        stream = slo_history(
+            stub,
+            start_date=start.strftime("%Y-%m-%d"),
+            max_workers=4,
+            parallel_backfill=True,
+        )
+        records = [row for row in stream.request_records({"slo_id": SLO_ID}) if isinstance(row, dict)]
+        assert len(records) == 8
+        assert stub.requests[SLO_HISTORY] == 8
+        assert stub.throttled[SLO_HISTORY] == 0
+
+
+def test_throttled_request_is_retried_after_the_reset():
+    with StubServer(StubOptions(points=24, rate_limit=2, rate_period=2)) as stub:
+        # Another client uses up the allowance at the start of a period.
+        time.sleep(2 - time.time() % 2)
+        for _ in range(2):
+            requests.get(
+                f"{stub.url}/api/v1/slo/{SLO_ID}/history", params={"from_ts": 0, "to_ts": 1}
+            ).raise_for_status()
+
+        stream = slo_history(stub)
+        end = closed_days_end()
+        records = list(stream.request_window({"slo_id": SLO_ID}, Window(end - SECONDS_PER_DAY, end)))
+        assert len(records) == 1
+        assert stub.throttled[SLO_HISTORY] == 1
+        assert stream.rate_limit_bucket(None).blocked_until > 0
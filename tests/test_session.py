@@ -0,0 +1,22 @@
+"""Tests for the pooled HTTP session."""
+
+from stub_server import StubOptions, StubServer
+
+from tap_datadog.session import build_session, connection_stats, connection_stats_since
+
+
+def test_stats_since_count_only_later_requests():
+    with StubServer(StubOptions()) as stub:
+        session = build_session()
+        url = f"{stub.url}/api/v1/slo/{'0' * 32}/history"
+        params = {"from_ts": 0, "to_ts": 1}
+        for _ in range(3):
+            session.get(url, params=params).raise_for_status()
+        before = connection_stats(session)
+        assert connection_stats_since(session, before) == []
+
+        for _ in range(2):
+            session.get(url, params=params).raise_for_status()
+        [stats] = connection_stats_since(session, before)
+        assert stats["requests"] == 2
+        assert (stats["connections_opened"], stats["connections_reused"]) == (0, 2)
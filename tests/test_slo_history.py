@@ -0,0 +1,53 @@
+"""Tests for the partitioned slo_history stream."""
+
+from tap_datadog.tap import TapDatadog
+from tap_datadog.windows import SECONDS_PER_DAY, closed_days_end
+
+US_PROD = "e96fa5aa00dc57af8718c8e7044b0f51"
+
+
+def slo_history(state: dict):
+    tap = TapDatadog(
+        config={
+            "api_key": "key",
+            "app_key": "app",
+            "start_date": "2022-01-01",
+            "window_mode": "daily",
+        },
+        state=state,
+        parse_env_config=False,
+    )
+    return tap.streams["slo_history"]
+
+
+def windows_requested(stream, context: dict) -> int:
+    stream._write_starting_replication_value(context)
+    return len(stream.get_windows(context))
+
+
+def test_former_stream_bookmark_seeds_the_partition():
+    end = closed_days_end()
+    state = {"bookmarks": {"slo_history_us_prod": {"replication_key_value": end - 2 * SECONDS_PER_DAY}}}
+    stream = slo_history(state)
+    assert windows_requested(stream, {"slo_id": US_PROD}) == 2
+    assert windows_requested(stream, {"slo_id": "12b1e51cb1bd57928ce126502a9a7e01"}) > 2
+
+
+def test_partition_bookmark_wins_over_the_former_stream():
+    end = closed_days_end()
+    state = {
+        "bookmarks": {
+            "slo_history_us_prod": {"replication_key_value": end - 5 * SECONDS_PER_DAY},
+            "slo_history": {
+                "partitions": [
+                    {
+                        "context": {"slo_id": US_PROD},
+                        "replication_key": "to_ts",
+                        "replication_key_value": end - SECONDS_PER_DAY,
+                    }
+                ]
+            },
+        }
+    }
+    stream = slo_history(state)
+    assert windows_requested(stream, {"slo_id": US_PROD}) == 1
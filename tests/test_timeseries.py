@@ -0,0 +1,62 @@
+"""Tests for the conversion of v2 timeseries responses to v1 query records."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from tap_datadog.pointlists import METRIC_OUTPUT_POINTS, format_metric_record
+from tap_datadog.timeseries import (
+    series_interval,
+    space_aggregator,
+    timeseries_payload,
+    timeseries_record,
+)
+
+FIXTURES = Path(__file__).parent.parent / "benchmarks" / "fixtures"
+COMPARED = [
+    "metric",
+    "scope",
+    "expression",
+    "tag_set",
+    "aggregation",
+    "interval",
+    "query_index",
+    "timestamp",
+    "value",
+]
+
+
+def load(name: str) -> dict:
+    return json.loads((FIXTURES / name).read_text())
+
+
+def comparable(record: dict) -> list:
+    """Points with a value, reduced to the fields both endpoints report."""
+    return sorted(
+        tuple(json.dumps(point.get(key)) for key in COMPARED)
+        for point in format_metric_record(record, METRIC_OUTPUT_POINTS)
+        if point["value"] is not None
+    )
+
+
+def test_v1_and_v2_fixtures_give_the_same_points():
+    v1, v2 = load("query_v1.json"), load("timeseries_v2.json")
+    payload = timeseries_payload([v1["query"]], v1["from_date"], v1["to_date"])
+    expected = comparable(v1)
+    assert expected
+    assert comparable(timeseries_record(v2, payload)) == expected
+
+
+@pytest.mark.parametrize(
+    "query, aggregator",
+    [("avg:system.load.1{*}", "avg"), ("sum:hits{env:prod} by {host}", "sum"), ("hits{*}", None)],
+)
+def test_space_aggregator(query, aggregator):
+    assert space_aggregator(query) == aggregator
+
+
+def test_series_interval_from_times_or_rollup():
+    assert series_interval("avg:hits{*}", [0, 60000, 120000]) == 60
+    assert series_interval("avg:hits{*}.rollup(sum, 3600)", [0]) == 3600
+    assert series_interval("avg:hits{*}.rollup(sum)", []) is None
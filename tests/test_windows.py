@@ -0,0 +1,57 @@
+"""Tests for date window planning."""
+
+import calendar
+
+from tap_datadog.windows import (
+    WINDOW_MODE_MONTH_TO_DATE,
+    Window,
+    day_windows,
+    slice_windows,
+)
+
+
+def epoch(year, month, day, hour=0, minute=0):
+    return calendar.timegm((year, month, day, hour, minute, 0))
+
+
+def test_day_windows_do_not_cross_months():
+    windows = day_windows(epoch(2022, 1, 30), epoch(2022, 2, 3), span_days=7)
+    assert windows == [
+        Window(epoch(2022, 1, 30), epoch(2022, 2, 1)),
+        Window(epoch(2022, 2, 1), epoch(2022, 2, 3)),
+    ]
+
+
+def test_month_to_date_window_after_the_last_day_window():
+    windows = day_windows(epoch(2022, 1, 10), epoch(2022, 1, 12), month_to_date=True)
+    assert windows == [
+        Window(epoch(2022, 1, 10), epoch(2022, 1, 11)),
+        Window(epoch(2022, 1, 11), epoch(2022, 1, 12)),
+        Window(epoch(2022, 1, 1), epoch(2022, 1, 12), WINDOW_MODE_MONTH_TO_DATE),
+    ]
+
+
+def test_month_to_date_window_after_each_closed_month():
+    windows = day_windows(epoch(2022, 1, 30), epoch(2022, 2, 3), month_to_date=True)
+    month_to_date = [window for window in windows if window.kind == WINDOW_MODE_MONTH_TO_DATE]
+    assert month_to_date == [
+        Window(epoch(2022, 1, 1), epoch(2022, 2, 1), WINDOW_MODE_MONTH_TO_DATE),
+        Window(epoch(2022, 2, 1), epoch(2022, 2, 3), WINDOW_MODE_MONTH_TO_DATE),
+    ]
+
+
+def test_month_to_date_window_when_day_window_spans_the_month():
+    windows = day_windows(epoch(2022, 2, 1), epoch(2022, 3, 1), span_days=31, month_to_date=True)
+    assert windows == [
+        Window(epoch(2022, 2, 1), epoch(2022, 3, 1)),
+        Window(epoch(2022, 2, 1), epoch(2022, 3, 1), WINDOW_MODE_MONTH_TO_DATE),
+    ]
+
+
+def test_slices_resume_inside_a_slice():
+    windows = slice_windows(epoch(2022, 1, 1, 0, 5), epoch(2022, 1, 1, 0, 45), 15 * 60)
+    assert [(window.start, window.end) for window in windows] == [
+        (epoch(2022, 1, 1, 0, 5), epoch(2022, 1, 1, 0, 15)),
+        (epoch(2022, 1, 1, 0, 15), epoch(2022, 1, 1, 0, 30)),
+        (epoch(2022, 1, 1, 0, 30), epoch(2022, 1, 1, 0, 45)),
+    ]